@@ -0,0 +1,159 @@
+"""Time the markdown pipeline and a full build on a synthetic corpus.
+
+Run from the repository root: ./bench.sh [--pages N] [--compare RESULTS]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from htmlnode import LeafNode, ParentNode
+from main import generate_pages_recursive
+from md_functions import markdown_to_html_node, text_to_textnodes
+from md_writer import markdown_to_html
+
+from benchmarks.corpus import SHAPES, generate_corpus, link_dense_paragraph, page
+
+RESULTS_DIR = os.path.join(".build", "benchmarks")
+TEMPLATE = "<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>"
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def wide_tree(items=20000):
+    return ParentNode(
+        "div",
+        [
+            ParentNode(
+                "ul", [ParentNode("li", [LeafNode("b", str(i))]) for i in range(items)]
+            )
+        ],
+    )
+
+
+def run_build(pages, jobs, size=1):
+    with tempfile.TemporaryDirectory() as root:
+        content = os.path.join(root, "content")
+        template = os.path.join(root, "template.html")
+        generate_corpus(content, pages, "mixed", size=size)
+        with open(template, "w") as file:
+            file.write(TEMPLATE)
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                content, template, os.path.join(root, "docs"), "/", jobs
+            )
+        return perf_counter() - start
+
+
+def run(args):
+    rng = random.Random(0)
+    results = {}
+    for shape in SHAPES:
+        markdown = page(rng, shape, args.size)
+        results[f"markdown_to_html_node[{shape}]"] = best_of(
+            lambda: markdown_to_html_node(markdown), args.repeat
+        )
+        results[f"markdown_to_html_node.to_html[{shape}]"] = best_of(
+            lambda: markdown_to_html_node(markdown).to_html(), args.repeat
+        )
+        results[f"markdown_to_html[{shape}]"] = best_of(
+            lambda: markdown_to_html(markdown), args.repeat
+        )
+    paragraph = link_dense_paragraph(rng, 500)
+    results["text_to_textnodes[500 links]"] = best_of(
+        lambda: text_to_textnodes(paragraph), args.repeat
+    )
+    tree = wide_tree()
+    results["ParentNode.to_html[20000 items]"] = best_of(tree.to_html, args.repeat)
+    # Build output is noisy, so full builds are timed once per job count
+    for jobs in sorted({1, args.jobs}):
+        results[f"generate_pages_recursive[{args.pages} pages, jobs={jobs}]"] = (
+            run_build(args.pages, jobs, args.size)
+        )
+    return results
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def load_results(path_or_revision):
+    path = path_or_revision
+    if not os.path.exists(path):
+        path = os.path.join(RESULTS_DIR, f"{path_or_revision}.json")
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def print_results(results, baseline=None):
+    width = max(len(name) for name in results)
+    for name, seconds in results.items():
+        line = f"{name:<{width}}  {seconds * 1000:>10.2f} ms"
+        if baseline and name in baseline:
+            line += f"  {seconds / baseline[name]:>6.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="bench.sh", description=__doc__)
+    parser.add_argument("--pages", type=int, default=50, help="pages in the full build")
+    parser.add_argument("--size", type=int, default=1, help="scale factor per page")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--compare", help="results file or git revision to compare against"
+    )
+    parser.add_argument(
+        "--no-save", action="store_true", help=f"do not store results in {RESULTS_DIR}"
+    )
+    args = parser.parse_args()
+
+    baseline = load_results(args.compare) if args.compare else None
+    results = run(args)
+    print_results(results, baseline)
+
+    if not args.no_save:
+        revision = git_revision()
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{revision}.json")
+        with open(path, "w") as file:
+            json.dump(
+                {"revision": revision, "args": vars(args), "results": results},
+                file,
+                indent=1,
+            )
+        print(f"saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import random
+
+SHAPES = ("links", "lists", "code", "mixed")
+WORDS = (
+    "hobbit ring shire elf dwarf wizard mountain river forest road tower "
+    "king sword song tale journey fellowship shadow light star"
+).split()
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def link_dense_paragraph(rng, links=50):
+    parts = []
+    for i in range(links):
+        parts.append(f"{sentence(rng, 4)} [{rng.choice(WORDS)} {i}](/pages/{i})")
+        if i % 5 == 0:
+            parts.append(f"**{rng.choice(WORDS)}** and _{rng.choice(WORDS)}_ `x{i}`")
+        if i % 10 == 0:
+            parts.append(f"![{rng.choice(WORDS)}](/images/{i}.png)")
+    return " ".join(parts)
+
+
+def long_list(rng, items=500, ordered=False):
+    lines = []
+    for i in range(items):
+        marker = f"{i + 1}." if ordered else "-"
+        lines.append(f"{marker} {sentence(rng, 6)} [link](/items/{i}) **{i}**")
+    return "\n".join(lines)
+
+
+def code_block(rng, lines=2000):
+    body = "\n".join(
+        f"def {rng.choice(WORDS)}_{i}(x): return x * {i}  # **not** _markdown_"
+        for i in range(lines)
+    )
+    return f"```\n{body}\n```"
+
+
+def page(rng, shape, size=1):
+    blocks = [f"# {sentence(rng, 4)[:-1]}"]
+    if shape in ("links", "mixed"):
+        blocks.extend(link_dense_paragraph(rng, 50 * size) for _ in range(5))
+    if shape in ("lists", "mixed"):
+        blocks.append(long_list(rng, 200 * size))
+        blocks.append(long_list(rng, 200 * size, ordered=True))
+    if shape in ("code", "mixed"):
+        blocks.append(code_block(rng, 1000 * size))
+    if shape == "mixed":
+        blocks.append("> " + sentence(rng) + "\n> " + sentence(rng))
+        blocks.append("## " + sentence(rng, 3))
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(root, pages=100, shape="mixed", depth=3, size=1, seed=0):
+    if shape not in SHAPES:
+        raise ValueError(f"invalid corpus shape {shape}")
+    rng = random.Random(seed)
+    paths = []
+    for i in range(pages):
+        # Spread pages over a nested directory tree `depth` levels deep
+        parts = [f"section{(i >> (2 * level)) % 4}" for level in range(depth)]
+        directory = os.path.join(root, *parts, f"page{i}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "index.md")
+        with open(path, "w") as file:
+            file.write(page(rng, shape, size))
+        paths.append(path)
+    return paths
@@ -0,0 +1,83 @@
+"""Bytes per node of the slotted node classes against dict-backed copies.
+
+Run from the repository root: PYTHONPATH=src python3 -m benchmarks.memory
+"""
+
+import sys
+import tracemalloc
+
+from htmlnode import LeafNode, ParentNode
+from md_functions import markdown_to_html_node
+from textnode import TextNode, TextType
+
+NODE_COUNT = 100_000
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictLeafNode:
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+class DictParentNode:
+    def __init__(self, tag, children, props=None):
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
+
+
+def bytes_per_node(factory, count=NODE_COUNT):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    nodes = [factory() for _ in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list holding the nodes is not part of the per-node cost
+    return (after - before - sys.getsizeof(nodes)) / count
+
+
+def peak_document_memory(markdown):
+    tracemalloc.start()
+    markdown_to_html_node(markdown).to_html()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def synthetic_document(paragraphs):
+    paragraph = "Some **bold** text, an _italic_ word, `code` and a [link](/page)."
+    return "# Benchmark\n\n" + "\n\n".join(paragraph for _ in range(paragraphs))
+
+
+def main():
+    child = [LeafNode(None, "text")]
+    cases = [
+        ("TextNode", lambda: DictTextNode("text", TextType.TEXT), lambda: TextNode("text", TextType.TEXT)),
+        ("LeafNode", lambda: DictLeafNode("b", "text"), lambda: LeafNode("b", "text")),
+        ("ParentNode", lambda: DictParentNode("p", child), lambda: ParentNode("p", child)),
+        ("LeafNode props={}", lambda: DictLeafNode("b", "text", {}), lambda: LeafNode("b", "text", {})),
+    ]
+    print(f"{'node':<20}{'dict bytes':>12}{'slots bytes':>13}{'saved':>8}")
+    for name, before, after in cases:
+        dict_size = bytes_per_node(before)
+        slot_size = bytes_per_node(after)
+        saved = 1 - slot_size / dict_size
+        print(f"{name:<20}{dict_size:>12.1f}{slot_size:>13.1f}{saved:>8.0%}")
+
+    markdown = synthetic_document(5000)
+    peak = peak_document_memory(markdown)
+    print(f"peak memory rendering {len(markdown)} bytes of markdown: {peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# Kept free of the build modules, so a request costs little more than
+# interpreter startup
+SOCKET_PATH = os.path.join(".build", "daemon.sock")
+
+
+def request(socket_path, message):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        with connection.makefile("rb") as file:
+            line = file.readline()
+    if not line:
+        raise ConnectionError("build daemon closed the connection")
+    return json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="client.py",
+        description='Send a request to a build daemon started with "main.py daemon".',
+    )
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="run an incremental build")
+    render = commands.add_parser("render", help="render the given content pages")
+    render.add_argument("pages", nargs="+")
+    commands.add_parser("status", help="show what the daemon holds in memory")
+    commands.add_parser("stop", help="save the caches and stop the daemon")
+    args = parser.parse_args(argv)
+
+    message = {"command": args.command}
+    if args.command == "render":
+        message["pages"] = [os.path.abspath(page) for page in args.pages]
+    try:
+        response = request(args.socket, message)
+    except OSError as error:
+        print(f"cannot reach build daemon at {args.socket}: {error}", file=sys.stderr)
+        return 2
+    sys.stdout.write(response["output"])
+    if not response["ok"]:
+        print(response["error"], file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (".html", ".css")
+SUFFIXES = (".gz", ".br")
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def available_suffixes():
+    if brotli is None:
+        return (".gz",)
+    return SUFFIXES
+
+
+def compress_data(data, suffix):
+    if suffix == ".gz":
+        # A fixed mtime keeps the archive identical for identical input
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def compress_file(path):
+    with open(path, "rb") as file:
+        data = file.read()
+    written = []
+    suffixes = available_suffixes()
+    for suffix in suffixes:
+        sibling_path = f"{path}{suffix}"
+        tmp_path = f"{sibling_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(compress_data(data, suffix))
+        os.replace(tmp_path, sibling_path)
+        written.append(sibling_path)
+    # A sibling from an encoder that is no longer installed would go stale
+    remove_siblings(path, [suffix for suffix in SUFFIXES if suffix not in suffixes])
+    return written
+
+
+def remove_siblings(path, suffixes=SUFFIXES):
+    removed = []
+    for suffix in suffixes:
+        sibling_path = f"{path}{suffix}"
+        if os.path.exists(sibling_path):
+            os.remove(sibling_path)
+            removed.append(sibling_path)
+    return removed
+
+
+def siblings(paths):
+    return {
+        f"{path}{suffix}"
+        for path in paths
+        if path.endswith(COMPRESSIBLE)
+        for suffix in available_suffixes()
+    }
+
+
+def update_siblings(report, compress=False, workers=None):
+    # Precompressed copies follow their outputs: written files are compressed
+    # again, unchanged ones only when a sibling is missing, and deleted ones
+    # lose theirs. Without compress, siblings of rewritten files are removed
+    # rather than left stale.
+    pending = []
+    for path in report.written:
+        if not path.endswith(COMPRESSIBLE):
+            continue
+        if compress:
+            pending.append(path)
+        else:
+            remove_siblings(path)
+    if compress:
+        for path in report.unchanged:
+            if path.endswith(COMPRESSIBLE) and not all(
+                os.path.exists(f"{path}{suffix}") for suffix in available_suffixes()
+            ):
+                pending.append(path)
+    for path in report.deleted:
+        remove_siblings(path)
+
+    # zlib and brotli release the GIL while compressing
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for written in executor.map(compress_file, pending):
+            report.compressed.extend(written)
+    return report.compressed
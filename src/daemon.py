@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import socketserver
+import threading
+from contextlib import redirect_stdout
+from io import StringIO
+from client import SOCKET_PATH, request
+from compress import update_siblings
+from depgraph import DependencyGraph
+from main import (
+    BLOCK_CACHE_FILE,
+    DEPGRAPH_PATH,
+    DURATIONS_PATH,
+    MANIFEST_PATH,
+    build_incremental,
+    find_pages,
+    generate_pages,
+    parse_args,
+    raise_for_failed,
+    remove_failed_outputs,
+)
+from manifest import Manifest, file_hash
+from pipeline import OutputReport
+from render_cache import BlockCache, RenderCache
+from schedule import RenderDurations
+from template import Template
+
+
+class BuildDaemon:
+    # Keeps the template, manifest, dependency graph and caches of one site
+    # in memory between requests. args are the parsed main.py build options.
+    def __init__(
+        self,
+        args,
+        static_dir="static",
+        dir_path_content="content",
+        template_path="template.html",
+        dest_dir_path="docs",
+        manifest_path=MANIFEST_PATH,
+        graph_path=DEPGRAPH_PATH,
+        durations_path=DURATIONS_PATH,
+    ):
+        self.args = args
+        self.static_dir = static_dir
+        self.dir_path_content = dir_path_content
+        self.template_path = template_path
+        self.dest_dir_path = dest_dir_path
+        self.manifest = Manifest.load(manifest_path)
+        self.graph = DependencyGraph.load(graph_path)
+        self.durations = RenderDurations.load(durations_path)
+        self.template = None
+        self.template_hash = None
+        self.block_cache_path = os.path.join(args.cache_dir, BLOCK_CACHE_FILE)
+        block_cache_size = args.block_cache_size * 1024 * 1024
+        self.cache = None
+        if args.cache:
+            self.cache = RenderCache(args.cache_dir, args.cache_size * 1024 * 1024)
+            self.block_cache = BlockCache.load(self.block_cache_path, block_cache_size)
+        else:
+            self.block_cache = BlockCache(block_cache_size)
+        self.requests = 0
+
+    def load_template(self):
+        template_hash = file_hash(self.template_path)
+        if template_hash != self.template_hash:
+            self.template = Template.load(self.template_path, self.args.basepath)
+            self.template_hash = template_hash
+        return self.template
+
+    def build(self):
+        report = OutputReport()
+        build_incremental(
+            self.static_dir,
+            self.dir_path_content,
+            self.template_path,
+            self.dest_dir_path,
+            self.args.basepath,
+            self.manifest.path,
+            self.graph.path,
+            jobs=self.args.jobs,
+            cache=self.cache,
+            checksum=self.args.checksum,
+            copy_mode=self.args.copy_mode,
+            io_workers=self.args.io_workers,
+            report=report,
+            compress=self.args.compress,
+            block_cache=self.block_cache,
+            manifest=self.manifest,
+            graph=self.graph,
+            template=self.load_template(),
+            durations=self.durations,
+        )
+        return report
+
+    def render(self, paths):
+        # Renders just the given pages, without hashing the rest of the site.
+        # Inputs may have changed since the last request, so nothing
+        # fingerprinted then may be reused.
+        self.graph.fingerprints.clear()
+        pages = {
+            os.path.abspath(from_path): (from_path, dest_path)
+            for from_path, dest_path in find_pages(
+                self.dir_path_content, self.dest_dir_path
+            )
+        }
+        unknown = [path for path in paths if os.path.abspath(path) not in pages]
+        if unknown:
+            raise ValueError(f"not a content page: {', '.join(unknown)}")
+        selected = dict(pages[os.path.abspath(path)] for path in paths)
+
+        report = OutputReport()
+        rendered, failed = generate_pages(
+            list(selected.items()),
+            self.load_template(),
+            cache=self.cache,
+            io_workers=self.args.io_workers,
+            report=report,
+            block_cache=self.block_cache,
+            durations=self.durations,
+        )
+        for from_path, metadata in rendered.items():
+            record = {
+                "hash": file_hash(from_path),
+                "basepath": self.args.basepath,
+                "dest": selected[from_path],
+            }
+            self.manifest.record(from_path, record)
+            self.graph.record(
+                from_path,
+                self.template_path,
+                metadata,
+                self.static_dir,
+                self.dir_path_content,
+            )
+        remove_failed_outputs(selected.items(), failed, report, self.manifest)
+        update_siblings(report, self.args.compress)
+        self.manifest.save()
+        self.graph.save()
+        raise_for_failed(failed)
+        return report
+
+    def status(self):
+        return (
+            f"{len(self.manifest.entries)} manifest entries, "
+            f"{len(self.graph.pages)} pages in the dependency graph, "
+            f"{self.block_cache!r}, {self.requests} requests served"
+        )
+
+    def handle(self, message):
+        self.requests += 1
+        command = message.get("command")
+        output = StringIO()
+        try:
+            with redirect_stdout(output):
+                match command:
+                    case "build":
+                        print(self.build().summary())
+                    case "render":
+                        print(self.render(message.get("pages", [])).summary())
+                    case "status":
+                        print(self.status())
+                    case "stop":
+                        print("Build daemon stopping")
+                    case _:
+                        raise ValueError(f"unknown command {command!r}")
+        except Exception as error:
+            return {"ok": False, "output": output.getvalue(), "error": str(error)}
+        finally:
+            # A daemon may run for days, so --cache-size holds per request
+            if command in ("build", "render") and self.cache is not None:
+                self.cache.evict()
+        return {"ok": True, "output": output.getvalue()}
+
+    def close(self):
+        self.durations.save()
+        if self.cache is not None:
+            self.cache.evict()
+            self.block_cache.save(self.block_cache_path)
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            message = json.loads(line)
+        except ValueError:
+            message = {}
+        response = self.server.builder.handle(message)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+        if message.get("command") == "stop" and response["ok"]:
+            # shutdown() waits for serve_forever, which is running this handler
+            threading.Thread(target=self.server.shutdown).start()
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_path, builder):
+        self.builder = builder
+        super().__init__(socket_path, DaemonRequestHandler)
+
+
+def is_listening(socket_path):
+    try:
+        request(socket_path, {"command": "status"})
+    except OSError:
+        return False
+    return True
+
+
+def run_daemon(builder, socket_path=SOCKET_PATH):
+    if os.path.exists(socket_path):
+        if is_listening(socket_path):
+            raise Exception(f"a build daemon is already listening on {socket_path}")
+        os.remove(socket_path)
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # The first build warms the template and caches
+    response = builder.handle({"command": "build"})
+    print(response["output"], end="")
+    if not response["ok"]:
+        print(response["error"])
+    with DaemonServer(socket_path, builder) as server:
+        print(f"Build daemon listening on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            builder.close()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+def daemon_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py daemon",
+        description="Keep a warm build process that serves build and render "
+        'requests from "client.py" over a Unix socket. Every other option is '
+        "a main.py build option.",
+    )
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    args, build_argv = parser.parse_known_args(argv)
+    run_daemon(BuildDaemon(parse_args(build_argv)), args.socket)
@@ -0,0 +1,154 @@
+import os
+from manifest import file_hash
+from state import load_state, save_state
+
+GRAPH_VERSION = 1
+DEPENDENCY_KINDS = ("template", "assets", "links")
+
+
+def resolve_asset(url, static_dir):
+    path = site_path(url)
+    if path is None:
+        return None
+    return os.path.normpath(os.path.join(static_dir, path))
+
+
+def resolve_link(url, static_dir, content_dir):
+    path = site_path(url)
+    if path is None:
+        return None
+    if path.endswith(".html"):
+        candidates = [os.path.join(content_dir, f"{path[:-len('.html')]}.md")]
+    else:
+        candidates = [os.path.join(content_dir, path, "index.md")]
+        if path:
+            candidates.append(os.path.join(content_dir, f"{path}.md"))
+    if path:
+        candidates.append(os.path.join(static_dir, path))
+    candidates = [os.path.normpath(candidate) for candidate in candidates]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    # A broken link depends on the page that would fix it
+    return candidates[0]
+
+
+def site_path(url):
+    # Only root-relative URLs point into this site, the basepath is added
+    # when the page is rendered
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    return url.split("#", 1)[0].split("?", 1)[0].strip("/")
+
+
+def fingerprint(kind, path):
+    try:
+        if kind == "template":
+            return file_hash(path)
+        if kind == "assets":
+            stat = os.stat(path)
+            return [stat.st_size, stat.st_mtime_ns]
+    except FileNotFoundError:
+        return None
+    # Pages only care whether the pages they link to exist
+    return os.path.exists(path)
+
+
+class DependencyGraph:
+    def __init__(self, path, pages=None, inputs=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        self.inputs = inputs if inputs is not None else {}
+        self.fingerprints = {}
+
+    @classmethod
+    def load(cls, path):
+        data = load_state(path, GRAPH_VERSION)
+        return cls(path, data.get("pages", {}), data.get("inputs", {}))
+
+    def update_inputs(self):
+        # Only valid once every page affected by a changed input was rendered
+        inputs = {kind: {} for kind in DEPENDENCY_KINDS}
+        for dependencies in self.pages.values():
+            for kind, path in self.edges(dependencies):
+                inputs[kind][path] = self.fingerprint(kind, path)
+        self.inputs = inputs
+
+    def save(self):
+        save_state(
+            self.path, GRAPH_VERSION, {"pages": self.pages, "inputs": self.inputs}
+        )
+
+    def fingerprint(self, kind, path):
+        key = (kind, path)
+        if key not in self.fingerprints:
+            self.fingerprints[key] = fingerprint(kind, path)
+        return self.fingerprints[key]
+
+    def edges(self, dependencies):
+        yield "template", dependencies["template"]
+        for kind in ("assets", "links"):
+            for path in dependencies[kind]:
+                yield kind, path
+
+    def dependents(self):
+        dependents = {}
+        for page, dependencies in self.pages.items():
+            for edge in self.edges(dependencies):
+                dependents.setdefault(edge, set()).add(page)
+        return dependents
+
+    def changed_inputs(self):
+        changed = []
+        for kind in DEPENDENCY_KINDS:
+            for path, previous in sorted(self.inputs.get(kind, {}).items()):
+                if self.fingerprint(kind, path) != previous:
+                    changed.append((kind, path))
+        return changed
+
+    def affected(self, changed=None):
+        if changed is None:
+            changed = self.changed_inputs()
+        dependents = self.dependents()
+        pages = set()
+        for edge in changed:
+            pages.update(dependents.get(edge, ()))
+        return pages
+
+    def is_current(self, page, template_path, affected):
+        dependencies = self.pages.get(page)
+        return (
+            dependencies is not None
+            and dependencies["template"] == template_path
+            and page not in affected
+        )
+
+    def record(self, page, template_path, metadata, static_dir, content_dir):
+        assets = set()
+        links = set()
+        for _, url in metadata["images"]:
+            path = resolve_asset(url, static_dir)
+            if path is not None:
+                assets.add(path)
+        for _, url in metadata["links"]:
+            path = resolve_link(url, static_dir, content_dir)
+            if path is not None and path != page:
+                links.add(path)
+        self.pages[page] = {
+            "template": template_path,
+            "assets": sorted(assets),
+            "links": sorted(links),
+        }
+        # New inputs start from their current state, known ones keep theirs
+        # so other pages that depend on them still see a change
+        for kind, path in self.edges(self.pages[page]):
+            self.inputs.setdefault(kind, {}).setdefault(
+                path, self.fingerprint(kind, path)
+            )
+
+    def retain(self, pages):
+        for page in set(self.pages) - set(pages):
+            del self.pages[page]
+
+    def __repr__(self):
+        return f"DependencyGraph({self.path}, {len(self.pages)} pages)"
@@ -0,0 +1,72 @@
+from textnode import TextType
+
+WORD_TEXT_TYPES = (
+    TextType.TEXT,
+    TextType.BOLD,
+    TextType.ITALIC,
+    TextType.CODE,
+    TextType.LINK,
+)
+
+
+class Document:
+    def __init__(
+        self, node=None, title=None, headings=None, links=None, images=None, word_count=0
+    ):
+        self.node = node
+        self.title = title
+        self.headings = headings if headings is not None else []
+        self.links = links if links is not None else []
+        self.images = images if images is not None else []
+        self.word_count = word_count
+
+    @classmethod
+    def from_metadata(cls, metadata, node=None):
+        return cls(
+            node,
+            metadata["title"],
+            [tuple(heading) for heading in metadata["headings"]],
+            [tuple(link) for link in metadata["links"]],
+            [tuple(image) for image in metadata["images"]],
+            metadata["word_count"],
+        )
+
+    def metadata(self):
+        return {
+            "title": self.title,
+            "headings": self.headings,
+            "links": self.links,
+            "images": self.images,
+            "word_count": self.word_count,
+        }
+
+    def add_metadata(self, metadata):
+        for level, text in metadata["headings"]:
+            self.add_heading(level, text)
+        self.links.extend(tuple(link) for link in metadata["links"])
+        self.images.extend(tuple(image) for image in metadata["images"])
+        self.word_count += metadata["word_count"]
+
+    def add_heading(self, level, text):
+        self.headings.append((level, text))
+        if self.title is None and level == 1:
+            self.title = text.strip()
+
+    def add_text(self, text):
+        self.word_count += len(text.split())
+
+    def add_text_nodes(self, text_nodes):
+        for text_node in text_nodes:
+            if text_node.text_type == TextType.LINK:
+                self.links.append((text_node.text, text_node.url))
+            elif text_node.text_type == TextType.IMAGE:
+                self.images.append((text_node.text, text_node.url))
+            if text_node.text_type in WORD_TEXT_TYPES:
+                self.add_text(text_node.text)
+
+    def __repr__(self):
+        return (
+            f"Document({self.title}, {len(self.headings)} headings, "
+            f"{len(self.links)} links, {len(self.images)} images, "
+            f"{self.word_count} words)"
+        )
@@ -1,19 +1,28 @@
+from io import StringIO
+
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
-        self.props = props
+        # Empty props share the None singleton instead of one dict per node
+        self.props = props or None
 
     def to_html(self):
+        out = StringIO()
+        self.write_html(out)
+        return out.getvalue()
+
+    def write_html(self, out):
         raise NotImplementedError()
 
     def props_to_html(self):
-        str = ""
-        if self.props:
-            for key, value in self.props.items():
-                str += f' {key}="{value}"'
-        return str
+        if not self.props:
+            return ""
+        return "".join(f' {key}="{value}"' for key, value in self.props.items())
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
@@ -27,35 +36,38 @@ class HTMLNode:
         )
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
-    def to_html(self):
+    def write_html(self, out):
         if self.value is None:
             raise ValueError(f"value is required for {self}")
         if self.tag is None:
-            return self.value
-        html_str = f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
-        return html_str
+            out.write(self.value)
+            return
+        out.write(f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>")
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def write_html(self, out):
         if self.tag is None:
             raise ValueError("tag is required")
         if self.children is None:
             raise ValueError("children are required")
-        html_str = f"<{self.tag}{self.props_to_html()}>"
+        out.write(f"<{self.tag}{self.props_to_html()}>")
         for child in self.children:
-            html_str += child.to_html()
-        html_str += f"</{self.tag}>"
-        return html_str
+            child.write_html(out)
+        out.write(f"</{self.tag}>")
 
     def __repr__(self):
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
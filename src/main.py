@@ -1,65 +1,453 @@
+import argparse
 import os
-import shutil
 import sys
-from re import findall
-from textnode import TextNode, TextType
-from md_functions import markdown_to_html_node
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from document import Document
+from md_functions import iter_blocks, markdown_to_document, read_title
+from md_writer import markdown_to_html, write_blocks_html
+from manifest import Manifest, file_hash
+from depgraph import DependencyGraph
+from template import Template
+from render_cache import BlockCache, RenderCache
+from schedule import RenderDurations
+from pipeline import IO_WORKERS, OutputReport, PagePipeline, replace_file, stream_file
+from sync import COPY_MODES, prune_directory, sync_directory
+from compress import remove_siblings, siblings, update_siblings
+from shard import load_costs, parse_shard, select_shard, write_shard_manifest
+from profiler import BuildProfile, StageTimer
+
+MANIFEST_PATH = os.path.join(".build", "manifest.json")
+DEPGRAPH_PATH = os.path.join(".build", "depgraph.json")
+CACHE_DIR = os.path.join(".build", "cache")
+PROFILE_PATH = os.path.join(".build", "profile.json")
+DURATIONS_PATH = os.path.join(".build", "durations.json")
+BLOCK_CACHE_FILE = "blocks.json"
 
 
 def main():
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    else:
-        basepath = "/"
-    move_directory("static", "docs")
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+    if sys.argv[1:2] == ["serve"]:
+        from server import serve_main
+
+        serve_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["daemon"]:
+        from daemon import daemon_main
+
+        daemon_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["merge"]:
+        from shard import merge_main
 
+        merge_main(sys.argv[2:])
+        return
 
-def move_directory(source, destination):
-    # Ensure the destination directory is clean
-    if os.path.exists(destination):
-        shutil.rmtree(destination)
-    os.makedirs(destination)
+    args = parse_args(sys.argv[1:])
+    cache = None
+    block_cache = None
+    block_cache_path = os.path.join(args.cache_dir, BLOCK_CACHE_FILE)
+    if args.cache:
+        cache = RenderCache(args.cache_dir, args.cache_size * 1024 * 1024)
+        block_cache = BlockCache.load(
+            block_cache_path, args.block_cache_size * 1024 * 1024
+        )
+    profile = BuildProfile() if args.profile else None
+    durations = RenderDurations.load(DURATIONS_PATH)
+    report = OutputReport()
+    # Whatever was built before a page failed is still reported and saved
+    try:
+        if args.incremental:
+            build_incremental(
+                "static",
+                "content",
+                "template.html",
+                "docs",
+                args.basepath,
+                MANIFEST_PATH,
+                DEPGRAPH_PATH,
+                jobs=args.jobs,
+                io_workers=args.io_workers,
+                cache=cache,
+                block_cache=block_cache,
+                checksum=args.checksum,
+                copy_mode=args.copy_mode,
+                profile=profile,
+                report=report,
+                compress=args.compress,
+                durations=durations,
+            )
+        else:
+            costs = None
+            if args.shard_costs is not None:
+                costs = load_costs(args.shard_costs, "content")
+            build_full(
+                "static",
+                "content",
+                "template.html",
+                "docs",
+                args.basepath,
+                jobs=args.jobs,
+                io_workers=args.io_workers,
+                cache=cache,
+                block_cache=block_cache,
+                checksum=args.checksum,
+                copy_mode=args.copy_mode,
+                profile=profile,
+                report=report,
+                compress=args.compress,
+                shard=args.shard,
+                costs=costs,
+                durations=durations,
+                manifest_path=MANIFEST_PATH,
+                graph_path=DEPGRAPH_PATH,
+            )
+    finally:
+        print(report.summary())
+        durations.save()
+        if cache is not None:
+            cache.evict()
+            block_cache.save(block_cache_path)
+        if profile is not None:
+            profile.finish()
+            print(profile.report(args.profile_top))
+            profile.save(args.profile_json, args.profile_top)
 
-    for entry in os.listdir(source):
-        source_path = os.path.join(source, entry)
-        destination_path = os.path.join(destination, entry)
-        if os.path.isfile(source_path):
-            shutil.copy(source_path, destination_path)
-        elif os.path.isdir(source_path):
-            move_directory(source_path, destination_path)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Build the static site into docs/.",
+        epilog='Use "main.py serve --watch" for a live-reloading development server '
+        'and "main.py daemon" for a build daemon driven by "client.py". Builds '
+        'split with --shard are combined with "main.py merge SHARD_DIR...".',
+    )
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild pages and assets whose inputs changed since the last build",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render pages (0 uses every core)",
+    )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=IO_WORKERS,
+        help="number of threads reading markdown ahead of rendering and writing pages",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content when size matches but mtime differs",
+    )
+    parser.add_argument(
+        "--copy-mode",
+        choices=COPY_MODES,
+        default="copy",
+        help="how static files are copied into docs/",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write precompressed .gz (and .br with brotli installed) copies of HTML and CSS",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse rendered article HTML for markdown seen in earlier builds",
+    )
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="render cache size limit in MB, least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=64,
+        help="size limit in MB of the cache of rendered markdown blocks",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report per-stage render timings and the slowest pages",
+    )
+    parser.add_argument("--profile-top", type=int, default=10)
+    parser.add_argument("--profile-json", default=PROFILE_PATH)
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="K/N",
+        help="only build the K-th of N slices of the site, for builds spread over machines",
+    )
+    parser.add_argument(
+        "--shard-costs",
+        metavar="PATH",
+        help="balance shards by the page timings in this --profile JSON report "
+        f"or in {DURATIONS_PATH}",
+    )
+    args = parser.parse_args(argv)
+    if args.shard is not None and args.incremental:
+        parser.error("--shard builds are always full builds")
+    if args.shard_costs is not None and args.shard is None:
+        parser.error("--shard-costs needs --shard")
+    if args.jobs < 0:
+        parser.error("--jobs must not be negative")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    if args.io_workers < 1:
+        parser.error("--io-workers must be at least 1")
+    return args
 
 
 def extract_titel(markdown):
-    first_line = markdown.strip().split("\n")[0]
-    heading = findall(r"^(#{1})\s(.+)", first_line)
-    if len(heading) != 0:
-        return heading[0][1].strip()
-    raise Exception("no h1 header")
+    # Same rule as the build: the first h1 anywhere on the page
+    return page_title(markdown_to_document(markdown))
 
 
 def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    render_page(from_path, dest_path, Template.load(template_path, basepath))
+
+
+def render_page(from_path, dest_path, template, profile=False, block_cache=None):
+    # The streaming counterpart of render_markdown, used for large pages. A
+    # first pass reads up to the title, the second writes every block through
+    # the template into the output file as soon as it is parsed. The render
+    # cache needs the whole text and is skipped; the block cache is used.
+    print(f"Generating page from {from_path} to {dest_path} using {template.path}")
+    timer = StageTimer() if profile else None
     with open(from_path) as file:
-        markdown = file.read()
-    with open(template_path) as file:
-        template = file.read()
-    content = markdown_to_html_node(markdown).to_html()
-    title = extract_titel(markdown)
-    structured_html = template.replace("{{ Title }}", title)
-    structured_html = structured_html.replace("{{ Content }}", content)
-    structured_html = structured_html.replace('href="/', f'href="{basepath}')
-    structured_html = structured_html.replace('src="/', f'src="{basepath}')
+        title = page_title(Document(title=read_title(file)))
+    if profile:
+        timer.lap("read title")
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    document = Document()
+    with open(from_path) as file:
+        blocks = iter_blocks(file)
+        written = stream_file(
+            dest_path,
+            lambda out: template.write(
+                out,
+                title,
+                lambda out: write_blocks_html(blocks, out, document, block_cache, timer),
+            ),
+        )
+    if profile:
+        timer.lap("template write")
+        return written, document.metadata(), timer.timings
+    return written, document.metadata(), None
+
+
+def render_markdown(
+    from_path,
+    dest_path,
+    markdown,
+    template,
+    cache=None,
+    profile=False,
+    block_cache=None,
+):
+    print(f"Generating page from {from_path} to {dest_path} using {template.path}")
+    timer = StageTimer() if profile else None
+    cached = None
+    if cache is not None:
+        key = cache.key(markdown)
+        cached = cache.get(key)
+        if profile:
+            timer.lap("cache lookup")
+    if cached is not None:
+        content_html, metadata = cached
+    else:
+        # Nothing inspects the node tree here, so skip building it
+        document = Document()
+        content_html = markdown_to_html(markdown, document, block_cache, timer)
+        metadata = document.metadata()
+        if cache is not None:
+            cache.put(key, content_html, metadata)
+    html = template.render(page_title(Document.from_metadata(metadata)), content_html)
+    if profile:
+        timer.lap("template fill")
+        return html, metadata, timer.timings, cached is not None
+    return html, metadata, None, cached is not None
+
+
+# Worker processes each keep their own block cache, seeded from the parent's.
+# The blocks they add go back with every task, see collect_worker_blocks
+worker_block_cache = None
 
+
+def init_worker(block_cache):
+    global worker_block_cache
+    worker_block_cache = block_cache
+    if block_cache is not None:
+        block_cache.track()
+
+
+def collect_worker_blocks():
+    return worker_block_cache.take_added()
+
+
+def render_markdown_in_worker(
+    from_path, dest_path, markdown, template, cache=None, profile=False
+):
+    return render_markdown(
+        from_path, dest_path, markdown, template, cache, profile, worker_block_cache
+    )
+
+
+def render_page_in_worker(from_path, dest_path, template, profile=False):
+    return render_page(from_path, dest_path, template, profile, worker_block_cache)
+
+
+def page_title(document):
+    if document.title is None:
+        raise Exception("no h1 header")
+    return document.title
+
+
+def write_output(dest_path, write):
     dest_dir, _ = os.path.split(dest_path)
-    if not os.path.exists(dest_dir):
-        os.mkdir(dest_dir)
+    os.makedirs(dest_dir, exist_ok=True)
+    replace_file(dest_path, write)
+
 
-    with open(dest_path, "w") as file:
-        file.write(structured_html)
+def find_pages(dir_path_content, dest_dir_path):
+    # One scandir per directory, the entry types come with the listing
+    pages = []
+    with os.scandir(dir_path_content) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_file():
+            dest_file = f"{".".join(entry.name.split(".")[:-1])}.html"
+            pages.append((entry.path, os.path.join(dest_dir_path, dest_file)))
+        elif entry.is_dir():
+            dest_path = os.path.join(dest_dir_path, entry.name)
+            pages.extend(find_pages(entry.path, dest_path))
+    return pages
 
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+def generate_pages(
+    pages,
+    template,
+    jobs=1,
+    cache=None,
+    profile=None,
+    io_workers=IO_WORKERS,
+    report=None,
+    block_cache=None,
+    durations=None,
+):
+    # Every output directory is created up front, so the writers only write
+    for dest_dir in sorted({os.path.dirname(dest_path) for _, dest_path in pages}):
+        os.makedirs(dest_dir, exist_ok=True)
+
+    profiling = profile is not None
+    if jobs > 1 and len(pages) > 1:
+        render = partial(
+            render_markdown_in_worker, template=template, cache=cache, profile=profiling
+        )
+        stream = partial(render_page_in_worker, template=template, profile=profiling)
+        costs = None
+        if durations is not None:
+            pages = durations.schedule(pages)
+            costs = durations.pages
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker, initargs=(block_cache,)
+        ) as executor:
+            pipeline = PagePipeline(
+                render,
+                executor,
+                io_workers,
+                report=report,
+                costs=costs,
+                stream=stream,
+                collect=collect_worker_blocks if block_cache is not None else None,
+                merge=block_cache.merge if block_cache is not None else None,
+            )
+            rendered, failed = pipeline.run(pages)
+        if report is not None:
+            report.add_workers(jobs, pipeline.busy, pipeline.elapsed)
+    else:
+        render = partial(
+            render_markdown,
+            template=template,
+            cache=cache,
+            profile=profiling,
+            block_cache=block_cache,
+        )
+        stream = partial(
+            render_page, template=template, profile=profiling, block_cache=block_cache
+        )
+        pipeline = PagePipeline(
+            render, io_workers=io_workers, report=report, stream=stream
+        )
+        rendered, failed = pipeline.run(pages)
+    if profile is not None:
+        for from_path, page_timings in pipeline.timings.items():
+            profile.add(from_path, page_timings)
+    if durations is not None:
+        durations.record(pipeline.durations)
+    return rendered, failed
+
+
+def raise_for_failed(failed):
+    if not failed:
+        return
+    details = "\n".join(f"  {path}: {error!r}" for path, error in failed.items())
+    raise Exception(f"{len(failed)} page(s) failed to generate:\n{details}")
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    jobs=1,
+    cache=None,
+    profile=None,
+    io_workers=IO_WORKERS,
+    report=None,
+    block_cache=None,
+    shard=None,
+    costs=None,
+    durations=None,
+):
+    pages = site_pages(dir_path_content, template_path, dest_dir_path, shard, costs)
+    template = Template.load(template_path, basepath)
+    _, failed = generate_pages(
+        pages,
+        template,
+        jobs,
+        cache,
+        profile,
+        io_workers,
+        report,
+        block_cache,
+        durations,
+    )
+    raise_for_failed(failed)
+
+
+def remove_failed_outputs(pages, failed, report, manifest=None):
+    # Failed pages lose their old output rather than serve a stale page
+    for from_path, dest_path in pages:
+        if from_path not in failed:
+            continue
+        if manifest is not None:
+            manifest.entries.pop(from_path, None)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+            report.deleted.append(dest_path)
+            report.deleted.extend(remove_siblings(dest_path))
+
+
+def site_pages(dir_path_content, template_path, dest_dir_path, shard=None, costs=None):
     if not os.path.exists(dir_path_content):
         raise Exception(f"{dir_path_content} doesn't exist")
 
@@ -69,17 +457,176 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
     if not os.path.exists(dest_dir_path):
         os.mkdir(dest_dir_path)
 
-    for entry in os.listdir(dir_path_content):
-        content_path = os.path.join(dir_path_content, entry)
-        if os.path.isfile(content_path):
-            dest_file = f"{".".join(entry.split(".")[:-1])}.html"
-            dest_path = os.path.join(dest_dir_path, dest_file)
-            generate_page(content_path, template_path, dest_path, basepath)
-        elif os.path.isdir(content_path):
-            dest_path = os.path.join(dest_dir_path, entry)
-            if not os.path.exists(dest_path):
-                os.mkdir(dest_path)
-            generate_pages_recursive(content_path, template_path, dest_path, basepath)
+    pages = find_pages(dir_path_content, dest_dir_path)
+    if shard is not None:
+        pages = select_shard(pages, dir_path_content, shard, costs)
+    return pages
+
+
+def build_full(
+    static_dir,
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    jobs=1,
+    cache=None,
+    checksum=False,
+    copy_mode="copy",
+    profile=None,
+    io_workers=IO_WORKERS,
+    report=None,
+    compress=False,
+    block_cache=None,
+    shard=None,
+    costs=None,
+    durations=None,
+    manifest_path=None,
+    graph_path=None,
+):
+    # Rebuilds into the existing output directory instead of wiping it, so
+    # files that come out identical keep their mtime. Once every page was
+    # rendered, anything this build did not produce is removed. A build that
+    # stops early leaves the rest of the old outputs alone.
+    if report is None:
+        report = OutputReport()
+    # The outputs are about to change behind the incremental build's records,
+    # so they are dropped and the next incremental build starts over
+    for path in (manifest_path, graph_path):
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+    os.makedirs(dest_dir_path, exist_ok=True)
+    # Static files are cheap to copy, the first shard takes all of them
+    if shard is None or shard[0] == 1:
+        sync_directory(
+            static_dir,
+            dest_dir_path,
+            checksum=checksum,
+            mode=copy_mode,
+            report=report,
+        )
+    pages = site_pages(dir_path_content, template_path, dest_dir_path, shard, costs)
+    template = Template.load(template_path, basepath)
+    _, failed = generate_pages(
+        pages,
+        template,
+        jobs,
+        cache,
+        profile,
+        io_workers,
+        report,
+        block_cache,
+        durations,
+    )
+    remove_failed_outputs(pages, failed, report)
+    update_siblings(report, compress)
+    raise_for_failed(failed)
+
+    keep = report.outputs()
+    if compress:
+        keep |= siblings(keep)
+    report.deleted.extend(prune_directory(dest_dir_path, keep))
+    if shard is not None:
+        write_shard_manifest(dest_dir_path, shard, basepath)
+    return report
+
+
+def build_incremental(
+    static_dir,
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    basepath,
+    manifest_path,
+    graph_path,
+    jobs=1,
+    cache=None,
+    checksum=False,
+    copy_mode="copy",
+    profile=None,
+    io_workers=IO_WORKERS,
+    report=None,
+    compress=False,
+    block_cache=None,
+    manifest=None,
+    graph=None,
+    template=None,
+    durations=None,
+):
+    # manifest, graph and template may be kept in memory across builds, as
+    # the build daemon does; otherwise they are loaded from their paths
+    if not os.path.exists(dir_path_content):
+        raise Exception(f"{dir_path_content} doesn't exist")
+
+    if not os.path.exists(template_path):
+        raise Exception(f"{template_path} doesn't exist")
+
+    if report is None:
+        report = OutputReport()
+    if manifest is None:
+        manifest = Manifest.load(manifest_path)
+    if graph is None:
+        graph = DependencyGraph.load(graph_path)
+    if template is None:
+        template = Template.load(template_path, basepath)
+    # Nothing seen or fingerprinted by an earlier build may carry over
+    manifest.seen.clear()
+    graph.fingerprints.clear()
+    os.makedirs(dest_dir_path, exist_ok=True)
+    sync_directory(static_dir, dest_dir_path, manifest, checksum, copy_mode, report)
+
+    # Template, asset and link changes only reach the pages that depend on them
+    affected = graph.affected()
+    pages = find_pages(dir_path_content, dest_dir_path)
+    stale = []
+    records = {}
+    for from_path, dest_path in pages:
+        record = {
+            "hash": file_hash(from_path),
+            "basepath": basepath,
+            "dest": dest_path,
+        }
+        fresh = manifest.is_fresh(from_path, record)
+        if not fresh or not graph.is_current(from_path, template_path, affected):
+            stale.append((from_path, dest_path))
+            records[from_path] = record
+        else:
+            report.add(dest_path, False)
+
+    rendered, failed = generate_pages(
+        stale,
+        template,
+        jobs,
+        cache,
+        profile,
+        io_workers,
+        report,
+        block_cache,
+        durations,
+    )
+    for from_path, metadata in rendered.items():
+        manifest.record(from_path, records[from_path])
+        graph.record(
+            from_path, template_path, metadata, static_dir, dir_path_content
+        )
+    remove_failed_outputs(stale, failed, report, manifest)
+    # Failed pages drop out of the graph so the next build retries them
+    graph.retain(from_path for from_path, _ in pages if from_path not in failed)
+
+    removed = manifest.remove_stale()
+    report.deleted.extend(removed)
+    update_siblings(report, compress)
+    for dest_path in removed:
+        print(f"Removed stale output {dest_path}")
+    manifest.save()
+    graph.update_inputs()
+    graph.save()
+    print(
+        f"Incremental build: {len(stale) - len(failed)} pages rendered, "
+        f"{len(removed)} outputs removed"
+    )
+    raise_for_failed(failed)
+    return manifest
 
 
 if __name__ == "__main__":
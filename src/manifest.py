@@ -0,0 +1,47 @@
+import hashlib
+import os
+from state import load_state, save_state
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.entries = entries if entries is not None else {}
+        self.seen = set()
+
+    @classmethod
+    def load(cls, path):
+        return cls(path, load_state(path, MANIFEST_VERSION).get("entries", {}))
+
+    def save(self):
+        save_state(self.path, MANIFEST_VERSION, {"entries": self.entries})
+
+    def is_fresh(self, source, entry):
+        self.seen.add(source)
+        return self.entries.get(source) == entry and os.path.exists(entry["dest"])
+
+    def record(self, source, entry):
+        self.seen.add(source)
+        self.entries[source] = entry
+
+    def remove_stale(self):
+        removed = []
+        for source in sorted(set(self.entries) - self.seen):
+            dest = self.entries.pop(source)["dest"]
+            if os.path.exists(dest):
+                os.remove(dest)
+            removed.append(dest)
+        return removed
+
+    def __repr__(self):
+        return f"Manifest({self.path}, {len(self.entries)} entries)"
@@ -1,7 +1,18 @@
 from textnode import TextNode, TextType, text_node_to_html_node
-from re import findall, search
 from enum import Enum
+from document import Document
 from htmlnode import ParentNode, LeafNode
+from md_patterns import (
+    BLOCK_PATTERN,
+    HEADING_PATTERN,
+    IMAGE_PATTERN,
+    INLINE_PATTERN,
+    LINK_PATTERN,
+)
+
+# Bump whenever the HTML produced for the same markdown changes, so cached
+# renders from an older parser are not reused.
+PARSER_VERSION = 2
 
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -34,102 +45,76 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 
 def extract_markdown_images(text):
-    matches = findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = IMAGE_PATTERN.findall(text)
     return matches
 
 
 def extract_markdown_links(text):
-    matches = findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = LINK_PATTERN.findall(text)
     return matches
 
 
-def split_node(node, alt, link, text_type):
-    if text_type not in [TextType.IMAGE, TextType.LINK]:
-        raise ValueError("invalid text type")
-
-    pattern = f"![{alt}]({link})" if text_type == TextType.IMAGE else f"[{alt}]({link})"
-    nodes_to_textnode = []
-    text = node.text
-    sub_nodes = text.split(pattern)
-    for i in range(len(sub_nodes)):
-        if sub_nodes[i] != "":
-            nodes_to_textnode.append(TextNode(sub_nodes[i], TextType.TEXT))
-        if i < len(sub_nodes) - 1:
-            nodes_to_textnode.append(TextNode(alt, text_type, link))
-
-    return nodes_to_textnode
-
-
-def split_nodes_image(old_nodes):
+def split_nodes_pattern(old_nodes, pattern, text_type):
     new_nodes = []
     for node in old_nodes:
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
             continue
 
-        images = extract_markdown_images(node.text)
-        if not images:
+        text = node.text
+        position = 0
+        for match in pattern.finditer(text):
+            if match.start() > position:
+                new_nodes.append(TextNode(text[position : match.start()], TextType.TEXT))
+            new_nodes.append(TextNode(match[1], text_type, match[2]))
+            position = match.end()
+
+        if position == 0:
             new_nodes.append(node)
-            continue
-
-        split_on_img = [node]
-        for alt, link in images:
-            split_on_img = [
-                sub_node
-                for node in split_on_img
-                for sub_node in (
-                    split_node(node, alt, link, TextType.IMAGE)
-                    if node.text_type == TextType.TEXT
-                    and alt in node.text
-                    and link in node.text
-                    else [node]
-                )
-            ]
-
-        new_nodes.extend(split_on_img)
+        elif position < len(text):
+            new_nodes.append(TextNode(text[position:], TextType.TEXT))
 
     return new_nodes
 
 
+def split_nodes_image(old_nodes):
+    return split_nodes_pattern(old_nodes, IMAGE_PATTERN, TextType.IMAGE)
+
+
 def split_nodes_link(old_nodes):
-    new_nodes = []
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
+    return split_nodes_pattern(old_nodes, LINK_PATTERN, TextType.LINK)
 
-        links = extract_markdown_links(node.text)
-        if not links:
-            new_nodes.append(node)
-            continue
 
-        split_on_link = [node]
-        for alt, url in links:
-            split_on_link = [
-                sub_node
-                for node in split_on_link
-                for sub_node in (
-                    split_node(node, alt, url, TextType.LINK)
-                    if node.text_type == TextType.TEXT
-                    and alt in node.text
-                    and url in node.text
-                    else [node]
-                )
-            ]
-
-        new_nodes.extend(split_on_link)
+INLINE_DELIMITERS = ("**", "_", "`")
 
-    return new_nodes
+
+def append_text_node(nodes, text):
+    if text == "":
+        return
+    if any(delimiter in text for delimiter in INLINE_DELIMITERS):
+        raise ValueError("invalid Markdown syntax")
+    nodes.append(TextNode(text, TextType.TEXT))
 
 
 def text_to_textnodes(text):
-    node = TextNode(text, TextType.TEXT)
-    split_b = split_nodes_delimiter([node], "**", TextType.BOLD)
-    split_b_i = split_nodes_delimiter(split_b, "_", TextType.ITALIC)
-    split_b_i_c = split_nodes_delimiter(split_b_i, "`", TextType.CODE)
-    split_b_i_c_img = split_nodes_image(split_b_i_c)
-    split_b_i_c_img_lnk = split_nodes_link(split_b_i_c_img)
-    return split_b_i_c_img_lnk
+    nodes = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        append_text_node(nodes, text[position : match.start()])
+        position = match.end()
+        match match.lastgroup:
+            case "src":
+                nodes.append(TextNode(match["alt"], TextType.IMAGE, match["src"]))
+            case "href":
+                nodes.append(TextNode(match["anchor"], TextType.LINK, match["href"]))
+            case "bold" if match["bold"]:
+                nodes.append(TextNode(match["bold"], TextType.BOLD))
+            case "italic" if match["italic"]:
+                nodes.append(TextNode(match["italic"], TextType.ITALIC))
+            case "code" if match["code"]:
+                nodes.append(TextNode(match["code"], TextType.CODE))
+    append_text_node(nodes, text[position:])
+    return nodes
 
 
 def markdown_to_blocks(markdown):
@@ -144,6 +129,27 @@ def markdown_to_blocks(markdown):
     return cleaned_blocks
 
 
+def iter_blocks(lines):
+    # Yields exactly what markdown_to_blocks returns, but from an iterable of
+    # lines (such as an open file), holding only the current block in memory.
+    # Only a truly empty line separates blocks, like split("\n\n") does;
+    # whitespace-only lines stay inside the block as empty lines.
+    block_lines = []
+    for line in lines:
+        if line == "\n" or line == "":
+            if block_lines:
+                block = "\n".join(block_lines).strip()
+                block_lines = []
+                if block:
+                    yield block
+            continue
+        block_lines.append(line.strip())
+    if block_lines:
+        block = "\n".join(block_lines).strip()
+        if block:
+            yield block
+
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -154,32 +160,21 @@ class BlockType(Enum):
 
 
 def block_to_block_type(text):
-    if search(r"^(#{1,6})\s(.+)", text):
-        return BlockType.HEADING
-    elif text[:3] == "```" and text[-3:] == "```":
-        return BlockType.CODE
-    elif text[0] == ">":
-        for line in text.split("\n"):
-            if line[0] != ">":
-                return BlockType.PARAGRAPH
-        return BlockType.QUOTE
-    elif text[:2] == "- ":
-        for line in text.split("\n"):
-            if line[:2] != "- ":
+    match = BLOCK_PATTERN.fullmatch(text)
+    if match is None:
+        return BlockType.PARAGRAPH
+    type = BlockType(match.lastgroup)
+    if type == BlockType.ORDERED_LIST:
+        for number, line in enumerate(text.split("\n"), 1):
+            if not line.startswith(f"{number}. "):
                 return BlockType.PARAGRAPH
-        return BlockType.UNORDERT_LIST
-    elif text[:3] == "1. ":
-        lines = text.split("\n")
-        for i in range(len(lines)):
-            start = f"{i + 1}. "
-            if lines[i][: len(start)] != start:
-                return BlockType.PARAGRAPH
-        return BlockType.ORDERED_LIST
-    return BlockType.PARAGRAPH
+    return type
 
 
-def text_to_children(text):
+def text_to_children(text, document=None):
     textnodes = text_to_textnodes(text)
+    if document is not None:
+        document.add_text_nodes(textnodes)
     html_nodes = []
     for textnode in textnodes:
         html_node = text_node_to_html_node(textnode)
@@ -193,8 +188,8 @@ def join_text_paragraph(paragraph_md):
 
 
 def extract_text_heading(heading_md):
-    heading = findall(r"^(#{1,6})\s(.+)", heading_md)[0]
-    return len(heading[0]), heading[1]
+    heading = HEADING_PATTERN.match(heading_md)
+    return len(heading[1]), heading[2]
 
 
 def extract_text_quote(quote_md):
@@ -203,46 +198,94 @@ def extract_text_quote(quote_md):
     return quote_block
 
 
-def extract_list_items(list_md):
+def extract_list_items(list_md, document=None):
     children = []
     lines = list_md.split("\n")
     for line in lines:
-        line_children = text_to_children(line.split(" ", 1)[1].strip())
+        line_children = text_to_children(line.split(" ", 1)[1].strip(), document)
         line_parent = ParentNode("li", line_children)
         children.append(line_parent)
     return children
 
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+def block_to_html_node(block, type, document=None):
+    match type:
+        case BlockType.PARAGRAPH:
+            paragraph = join_text_paragraph(block)
+            children = text_to_children(paragraph, document)
+            return ParentNode("p", children)
+        case BlockType.HEADING:
+            h_, text = extract_text_heading(block)
+            if document is not None:
+                document.add_heading(h_, text)
+            children = text_to_children(text, document)
+            return ParentNode(f"h{h_}", children)
+        case BlockType.CODE:
+            code = block[3:-3].lstrip()
+            if document is not None:
+                document.add_text(code)
+            children = LeafNode("code", code)
+            return ParentNode("pre", [children])
+        case BlockType.QUOTE:
+            quote_block = extract_text_quote(block)
+            children = text_to_children(quote_block, document)
+            return ParentNode("blockquote", children)
+        case BlockType.UNORDERT_LIST:
+            children = extract_list_items(block, document)
+            return ParentNode("ul", children)
+        case BlockType.ORDERED_LIST:
+            children = extract_list_items(block, document)
+            return ParentNode("ol", children)
+
+
+def read_title(lines):
+    # The title Document would find, the first h1, without rendering the
+    # page. Stops reading at that heading.
+    for block in iter_blocks(lines):
+        if block_to_block_type(block) != BlockType.HEADING:
+            continue
+        level, text = extract_text_heading(block)
+        if level == 1:
+            return text.strip()
+    return None
+
+
+def markdown_to_document(markdown, block_cache=None):
+    return blocks_to_document(markdown_to_blocks(markdown), block_cache)
 
+
+def read_document(file, block_cache=None):
+    return blocks_to_document(iter_blocks(file), block_cache)
+
+
+def blocks_to_document(blocks, block_cache=None):
+    document = Document()
     html_nodes = []
     for block in blocks:
+        if block_cache is not None:
+            html_nodes.append(cached_block_node(block, document, block_cache))
+            continue
+        type = block_to_block_type(block)
+        html_nodes.append(block_to_html_node(block, type, document))
+
+    document.node = ParentNode("div", html_nodes)
+    return document
+
+
+def cached_block_node(block, document, block_cache):
+    # A cached block comes back as its serialized HTML in a tagless leaf,
+    # which to_html writes out unchanged
+    cached = block_cache.get(block)
+    if cached is None:
+        block_document = Document()
         type = block_to_block_type(block)
+        html = block_to_html_node(block, type, block_document).to_html()
+        cached = html, block_document.metadata()
+        block_cache.put(block, *cached)
+    html, metadata = cached
+    document.add_metadata(metadata)
+    return LeafNode(None, html)
 
-        match type:
-            case BlockType.PARAGRAPH:
-                paragraph = join_text_paragraph(block)
-                children = text_to_children(paragraph)
-                parent = ParentNode("p", children)
-            case BlockType.HEADING:
-                h_, text = extract_text_heading(block)
-                children = text_to_children(text)
-                parent = ParentNode(f"h{h_}", children)
-            case BlockType.CODE:
-                children = LeafNode("code", block[3:-3].lstrip())
-                parent = ParentNode("pre", [children])
-            case BlockType.QUOTE:
-                quote_block = extract_text_quote(block)
-                children = text_to_children(quote_block)
-                parent = ParentNode("blockquote", children)
-            case BlockType.UNORDERT_LIST:
-                children = extract_list_items(block)
-                parent = ParentNode("ul", children)
-            case BlockType.ORDERED_LIST:
-                children = extract_list_items(block)
-                parent = ParentNode("ol", children)
-
-        html_nodes.append(parent)
-
-    return ParentNode("div", html_nodes)
+
+def markdown_to_html_node(markdown):
+    return markdown_to_document(markdown).node
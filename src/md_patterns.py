@@ -0,0 +1,26 @@
+import re
+
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+INLINE_PATTERN = re.compile(
+    r"!\[(?P<alt>[^\[\]]*)\]\((?P<src>[^\(\)]*)\)"
+    r"|\[(?P<anchor>[^\[\]]*)\]\((?P<href>[^\(\)]*)\)"
+    r"|\*\*(?P<bold>.*?)\*\*"
+    r"|_(?P<italic>.*?)_"
+    r"|`(?P<code>.*?)`",
+    re.DOTALL,
+)
+
+HEADING_PATTERN = re.compile(r"(#{1,6})\s(.+)")
+
+# Every block type starts with a different character, so at most one
+# alternative can apply and a failed fullmatch means a paragraph. Group
+# names are the BlockType values.
+BLOCK_PATTERN = re.compile(
+    r"(?P<heading>#{1,6}\s.[\s\S]*)"
+    r"|(?P<code>(?=```)[\s\S]*(?<=```))"
+    r"|(?P<quote>>[^\n]*(?:\n>[^\n]*)*)"
+    r"|(?P<unordered_list>- [^\n]*(?:\n- [^\n]*)*)"
+    r"|(?P<ordered_list>1\. [^\n]*(?:\n\d+\. [^\n]*)*)"
+)
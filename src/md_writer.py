@@ -0,0 +1,138 @@
+from io import StringIO
+from document import Document
+from md_functions import (
+    INLINE_DELIMITERS,
+    BlockType,
+    block_to_block_type,
+    extract_text_heading,
+    extract_text_quote,
+    join_text_paragraph,
+    markdown_to_blocks,
+)
+from md_patterns import INLINE_PATTERN
+
+# Writes the same HTML as markdown_to_html_node(...).to_html() straight from
+# the block and inline scanners, without building TextNode or HTMLNode trees.
+# test_md_writer checks the two stay byte-identical; anything that changes
+# the output here must change there too. With --profile, timer is a
+# profiler.StageTimer that gets a lap after every stage.
+
+
+def markdown_to_html(markdown, document=None, block_cache=None, timer=None):
+    out = StringIO()
+    blocks = markdown_to_blocks(markdown)
+    if timer is not None:
+        timer.lap("markdown_to_blocks")
+    write_blocks_html(blocks, out, document, block_cache, timer)
+    return out.getvalue()
+
+
+def write_blocks_html(blocks, out, document=None, block_cache=None, timer=None):
+    out.write("<div>")
+    for block in blocks:
+        if block_cache is None:
+            write_block_html(block, out, document, timer)
+        else:
+            out.write(cached_block_html(block, document, block_cache, timer))
+    out.write("</div>")
+
+
+def cached_block_html(block, document, block_cache, timer=None):
+    cached = block_cache.get(block)
+    if timer is not None:
+        timer.lap("block cache")
+    if cached is None:
+        block_document = Document()
+        out = StringIO()
+        write_block_html(block, out, block_document, timer)
+        cached = out.getvalue(), block_document.metadata()
+        block_cache.put(block, *cached)
+    html, metadata = cached
+    if document is not None:
+        document.add_metadata(metadata)
+    return html
+
+
+def write_block_html(block, out, document=None, timer=None):
+    block_type = block_to_block_type(block)
+    if timer is not None:
+        timer.lap("block typing")
+    match block_type:
+        case BlockType.PARAGRAPH:
+            out.write("<p>")
+            write_inline_html(join_text_paragraph(block), out, document)
+            out.write("</p>")
+        case BlockType.HEADING:
+            level, text = extract_text_heading(block)
+            if document is not None:
+                document.add_heading(level, text)
+            out.write(f"<h{level}>")
+            write_inline_html(text, out, document)
+            out.write(f"</h{level}>")
+        case BlockType.CODE:
+            code = block[3:-3].lstrip()
+            if document is not None:
+                document.add_text(code)
+            out.write(f"<pre><code>{code}</code></pre>")
+        case BlockType.QUOTE:
+            out.write("<blockquote>")
+            write_inline_html(extract_text_quote(block), out, document)
+            out.write("</blockquote>")
+        case BlockType.UNORDERT_LIST:
+            write_list_html("ul", block, out, document)
+        case BlockType.ORDERED_LIST:
+            write_list_html("ol", block, out, document)
+    if timer is not None:
+        timer.lap("inline parsing")
+
+
+def write_list_html(tag, block, out, document=None):
+    out.write(f"<{tag}>")
+    for line in block.split("\n"):
+        out.write("<li>")
+        write_inline_html(line.split(" ", 1)[1].strip(), out, document)
+        out.write("</li>")
+    out.write(f"</{tag}>")
+
+
+def write_inline_html(text, out, document=None):
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        write_text(text[position : match.start()], out, document)
+        position = match.end()
+        match match.lastgroup:
+            case "src":
+                alt, src = match["alt"], match["src"]
+                out.write(f'<img src="{src}" alt="{alt}"></img>')
+                if document is not None:
+                    document.images.append((alt, src))
+            case "href":
+                anchor, href = match["anchor"], match["href"]
+                out.write(f'<a href="{href}">{anchor}</a>')
+                if document is not None:
+                    document.links.append((anchor, href))
+                    document.add_text(anchor)
+            case "bold" if match["bold"]:
+                write_tagged("b", match["bold"], out, document)
+            case "italic" if match["italic"]:
+                write_tagged("i", match["italic"], out, document)
+            case "code" if match["code"]:
+                write_tagged("code", match["code"], out, document)
+    write_text(text[position:], out, document)
+
+
+def write_tagged(tag, text, out, document=None):
+    out.write(f"<{tag}>{text}</{tag}>")
+    if document is not None:
+        document.add_text(text)
+
+
+def write_text(text, out, document=None):
+    if text == "":
+        return
+    # Unmatched delimiters are an error, as in text_to_textnodes
+    if any(delimiter in text for delimiter in INLINE_DELIMITERS):
+        raise ValueError("invalid Markdown syntax")
+    out.write(text)
+    if document is not None:
+        document.add_text(text)
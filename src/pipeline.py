@@ -0,0 +1,328 @@
+import filecmp
+import math
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import perf_counter
+
+IO_WORKERS = 8
+# Pages that may be read ahead of, or waiting behind, the render stage
+PREFETCH = 32
+# Pages known to render quickly are sent to worker processes in batches of
+# about this much work, so the tail of tiny pages isn't dominated by IPC
+CHUNK_SECONDS = 0.02
+CHUNK_PAGES = 32
+# Larger pages are rendered from the source file straight into the output
+# file, instead of being held as whole strings between the stages
+STREAM_BYTES = 512 * 1024
+
+
+def read_text(path, limit=None):
+    # Returns no text for files above limit, they are left to the stream stage
+    started = perf_counter()
+    if limit is not None and os.stat(path).st_size > limit:
+        return None, perf_counter() - started
+    with open(path) as file:
+        text = file.read()
+    return text, perf_counter() - started
+
+
+def write_text(path, text):
+    # Identical output is left alone so its mtime survives for rsync and CDN
+    # uploads. Returns whether the file was written and how long it took.
+    started = perf_counter()
+    written = not has_content(path, text)
+    if written:
+        replace_file(path, lambda file: file.write(text))
+    return written, perf_counter() - started
+
+
+def has_content(path, text):
+    # The size check keeps most changed files from being read back
+    try:
+        if os.stat(path).st_size != len(text.encode()):
+            return False
+        with open(path) as file:
+            return file.read() == text
+    except (OSError, ValueError):
+        return False
+
+
+def stream_file(path, write):
+    # write_text for output produced in pieces: the temp file only replaces
+    # the output if the two differ
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as file:
+            write(file)
+        if os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False):
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def stream_page(stream, from_path, dest_path, collect=None):
+    # Runs in the worker like render_pages, for a page too large to pass
+    # between processes
+    started = perf_counter()
+    written, metadata, timings = stream(from_path, dest_path)
+    seconds = perf_counter() - started
+    return written, seconds, metadata, timings, collect() if collect is not None else None
+
+
+def replace_file(path, write):
+    # The temp file is per process, other processes may replace path too
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as file:
+            write(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def render_pages(render, pages, collect=None):
+    # Runs in the worker. Every page is timed and fails on its own. collect
+    # returns what the worker learned that the parent should keep.
+    results = []
+    for from_path, dest_path, markdown in pages:
+        started = perf_counter()
+        try:
+            result, error = render(from_path, dest_path, markdown), None
+        except Exception as exception:
+            result, error = None, exception
+        results.append((result, error, perf_counter() - started))
+    return results, collect() if collect is not None else None
+
+
+def run_inline(function, *args):
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as error:
+        future.set_exception(error)
+    return future
+
+
+class OutputReport:
+    def __init__(self):
+        self.written = []
+        self.unchanged = []
+        self.deleted = []
+        self.compressed = []
+        self.workers = 0
+        self.busy = 0.0
+        self.elapsed = 0.0
+
+    def add_workers(self, workers, busy, elapsed):
+        self.workers = max(self.workers, workers)
+        self.busy += busy
+        self.elapsed += elapsed
+
+    def add(self, path, written):
+        if written:
+            self.written.append(path)
+        else:
+            self.unchanged.append(path)
+
+    def outputs(self):
+        return set(self.written) | set(self.unchanged)
+
+    def summary(self):
+        summary = (
+            f"Outputs: {len(self.written)} written, {len(self.unchanged)} unchanged, "
+            f"{len(self.deleted)} deleted"
+        )
+        if self.compressed:
+            summary += f", {len(self.compressed)} compressed"
+        if self.workers and self.elapsed:
+            utilization = self.busy / (self.workers * self.elapsed)
+            summary += (
+                f"\nRender workers: {self.workers}, {utilization:.0%} busy "
+                f"over {self.elapsed:.2f}s"
+            )
+        return summary
+
+
+class PagePipeline:
+    # Reads markdown on I/O threads ahead of the render stage and hands the
+    # rendered HTML to I/O threads for writing, so blocking file access
+    # overlaps with parsing. render(from_path, dest_path, markdown) returns
+    # (html, metadata, timings, cached) and runs inline or on the given
+    # executor. costs are the expected render seconds of pages, used to batch
+    # the small ones. Measured render seconds end up in durations, except for
+    # pages served from a cache, which say nothing about their cost. Pages above
+    # stream_bytes are never read here: stream(from_path, dest_path) runs
+    # where render would, reads the source and writes the output itself, and
+    # returns (written, metadata, timings). With an executor, collect runs in
+    # the worker after each task and merge gets its result in this process.
+    def __init__(
+        self,
+        render,
+        executor=None,
+        io_workers=IO_WORKERS,
+        prefetch=PREFETCH,
+        report=None,
+        costs=None,
+        stream=None,
+        stream_bytes=None,
+        collect=None,
+        merge=None,
+    ):
+        self.render = render
+        self.collect = collect
+        self.merge = merge
+        self.stream = stream
+        self.stream_bytes = None
+        if stream is not None:
+            self.stream_bytes = STREAM_BYTES if stream_bytes is None else stream_bytes
+        self.executor = executor
+        self.io_workers = io_workers
+        self.prefetch = max(prefetch, 1)
+        self.report = report
+        self.costs = costs if costs is not None else {}
+        self.rendered = {}
+        self.failed = {}
+        self.timings = {}
+        self.durations = {}
+        self.busy = 0.0
+        self.elapsed = 0.0
+
+    def run(self, pages):
+        started = perf_counter()
+        pages = iter(pages)
+        reads = deque()
+        self.chunk = []
+        self.chunk_cost = 0.0
+        self.renders = deque()
+        self.writes = deque()
+        with ThreadPoolExecutor(max_workers=self.io_workers) as self.io:
+            for _ in range(self.prefetch):
+                self.read_next(pages, reads)
+            while reads:
+                (from_path, dest_path), read = reads.popleft()
+                self.read_next(pages, reads)
+                try:
+                    markdown, read_time = read.result()
+                except Exception as error:
+                    self.failed[from_path] = error
+                    continue
+                if markdown is None:
+                    self.submit_stream(from_path, dest_path)
+                    continue
+                self.submit_render(from_path, dest_path, markdown, read_time)
+            self.submit_chunk()
+            while self.renders:
+                self.finish_render()
+            while self.writes:
+                self.finish_write()
+        self.elapsed = perf_counter() - started
+        return self.rendered, self.failed
+
+    def read_next(self, pages, reads):
+        page = next(pages, None)
+        if page is not None:
+            reads.append((page, self.io.submit(read_text, page[0], self.stream_bytes)))
+
+    def submit_stream(self, from_path, dest_path):
+        if self.executor is None:
+            future = run_inline(stream_page, self.stream, from_path, dest_path)
+        else:
+            future = self.executor.submit(
+                stream_page, self.stream, from_path, dest_path, self.collect
+            )
+        self.writes.append((from_path, dest_path, future, True))
+        while len(self.writes) > self.prefetch:
+            self.finish_write()
+
+    def submit_render(self, from_path, dest_path, markdown, read_time):
+        # Pages without a known cost are sent on their own
+        self.chunk.append((from_path, dest_path, markdown, read_time))
+        self.chunk_cost += self.costs.get(from_path, math.inf)
+        if (
+            self.executor is None
+            or self.chunk_cost >= CHUNK_SECONDS
+            or len(self.chunk) >= CHUNK_PAGES
+        ):
+            self.submit_chunk()
+
+    def submit_chunk(self):
+        if not self.chunk:
+            return
+        pages = []
+        work = []
+        for from_path, dest_path, markdown, read_time in self.chunk:
+            pages.append((from_path, dest_path, read_time))
+            work.append((from_path, dest_path, markdown))
+        self.chunk = []
+        self.chunk_cost = 0.0
+        if self.executor is None:
+            future = run_inline(render_pages, self.render, work)
+        else:
+            future = self.executor.submit(render_pages, self.render, work, self.collect)
+        self.renders.append((pages, future))
+        while len(self.renders) > (0 if self.executor is None else self.prefetch):
+            self.finish_render()
+
+    def finish_render(self):
+        pages, future = self.renders.popleft()
+        try:
+            results, collected = future.result()
+        except Exception as error:
+            for from_path, _, _ in pages:
+                self.failed[from_path] = error
+            return
+        if collected is not None and self.merge is not None:
+            self.merge(collected)
+        for page, result in zip(pages, results):
+            self.finish_page(*page, *result)
+
+    def finish_page(self, from_path, dest_path, read_time, result, error, seconds):
+        self.busy += seconds
+        if error is not None:
+            self.failed[from_path] = error
+            return
+        html, metadata, timings, cached = result
+        if not cached:
+            self.durations[from_path] = seconds
+        self.rendered[from_path] = metadata
+        if timings is not None:
+            timings["read"] = read_time
+            self.timings[from_path] = timings
+        future = self.io.submit(write_text, dest_path, html)
+        self.writes.append((from_path, dest_path, future, False))
+        while len(self.writes) > self.prefetch:
+            self.finish_write()
+
+    def finish_write(self):
+        from_path, dest_path, future, streamed = self.writes.popleft()
+        try:
+            if streamed:
+                written, seconds, metadata, timings, collected = future.result()
+            else:
+                written, write_time = future.result()
+        except Exception as error:
+            self.failed[from_path] = error
+            self.rendered.pop(from_path, None)
+            self.timings.pop(from_path, None)
+            self.durations.pop(from_path, None)
+            return
+        if self.report is not None:
+            self.report.add(dest_path, written)
+        if streamed:
+            if collected is not None and self.merge is not None:
+                self.merge(collected)
+            self.busy += seconds
+            self.rendered[from_path] = metadata
+            self.durations[from_path] = seconds
+            if timings is not None:
+                self.timings[from_path] = timings
+        elif from_path in self.timings:
+            self.timings[from_path]["write"] = write_time
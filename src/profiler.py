@@ -0,0 +1,95 @@
+import json
+import os
+from time import perf_counter
+
+STAGES = [
+    "read",
+    "cache lookup",
+    "markdown_to_blocks",
+    "block cache",
+    "block typing",
+    "inline parsing",
+    "template fill",
+    # Pages too large to hold whole are read once for the title, then
+    # rendered block by block into the output
+    "read title",
+    "template write",
+    "write",
+]
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+        self.last = perf_counter()
+
+    def lap(self, stage):
+        now = perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self.last
+        self.last = now
+
+
+class BuildProfile:
+    def __init__(self):
+        self.pages = {}
+        self.started = perf_counter()
+        self.wall_time = None
+
+    def add(self, page, timings):
+        self.pages[page] = timings
+
+    def finish(self):
+        self.wall_time = perf_counter() - self.started
+
+    def totals(self):
+        totals = dict.fromkeys(STAGES, 0.0)
+        for timings in self.pages.values():
+            for stage, seconds in timings.items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return {stage: seconds for stage, seconds in totals.items() if seconds}
+
+    def slowest(self, count=10):
+        ranked = sorted(
+            self.pages.items(), key=lambda item: (-sum(item[1].values()), item[0])
+        )
+        return ranked[:count]
+
+    def to_json(self, count=10):
+        return {
+            "wall_time": self.wall_time,
+            "page_count": len(self.pages),
+            "totals": self.totals(),
+            "slowest": [
+                {"page": page, "total": sum(timings.values()), "stages": timings}
+                for page, timings in self.slowest(count)
+            ],
+            "pages": self.pages,
+        }
+
+    def save(self, path, count=10):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.to_json(count), file, indent=1)
+
+    def report(self, count=10):
+        totals = self.totals()
+        render_time = sum(totals.values())
+        lines = [f"{'stage':<20}{'total ms':>12}{'share':>8}"]
+        for stage, seconds in totals.items():
+            share = seconds / render_time if render_time else 0.0
+            lines.append(f"{stage:<20}{seconds * 1000:>12.2f}{share:>8.1%}")
+        lines.append(f"{'all stages':<20}{render_time * 1000:>12.2f}")
+        if self.wall_time is not None:
+            lines.append(f"{'wall time':<20}{self.wall_time * 1000:>12.2f}")
+
+        lines.append("")
+        lines.append(f"slowest {min(count, len(self.pages))} of {len(self.pages)} pages:")
+        for page, timings in self.slowest(count):
+            stage, seconds = max(timings.items(), key=lambda item: item[1])
+            lines.append(
+                f"{sum(timings.values()) * 1000:>10.2f} ms  {page}"
+                f"  (mostly {stage}: {seconds * 1000:.2f} ms)"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from md_functions import PARSER_VERSION
+from pipeline import replace_file
+from state import load_state, save_state
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+class RenderCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, markdown):
+        digest = hashlib.sha256(f"{PARSER_VERSION}\0".encode())
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key[2:]}.json")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        # The modification time doubles as the last-used stamp for eviction
+        os.utime(path)
+        return entry["html"], entry["metadata"]
+
+    def put(self, key, html, metadata):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        replace_file(
+            path, lambda file: json.dump({"html": html, "metadata": metadata}, file)
+        )
+
+    def entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def __repr__(self):
+        return f"RenderCache({self.directory}, {self.max_bytes} bytes)"
+
+
+def entry_size(block, html):
+    return len(block.encode()) + len(html.encode())
+
+
+class BlockCache:
+    # Rendered HTML and metadata per cleaned markdown block, shared by every
+    # page rendered in this process and evicted least recently used first.
+    # Sizes are counted in encoded bytes.
+    def __init__(self, max_bytes=DEFAULT_BLOCK_BYTES):
+        self.max_bytes = max_bytes
+        self.blocks = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # Only worker processes track their additions, see track()
+        self.added = None
+
+    @classmethod
+    def load(cls, path, max_bytes=DEFAULT_BLOCK_BYTES):
+        cache = cls(max_bytes)
+        for block, html, metadata in load_state(path, PARSER_VERSION).get("blocks", []):
+            cache.put(block, html, metadata)
+        return cache
+
+    def save(self, path):
+        # Compact, unlike the other state files: it holds up to
+        # --block-cache-size of HTML
+        blocks = [
+            [block, html, metadata] for block, (html, metadata) in self.blocks.items()
+        ]
+        save_state(path, PARSER_VERSION, {"blocks": blocks}, indent=None)
+
+    def get(self, block):
+        entry = self.blocks.get(block)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.blocks.move_to_end(block)
+        self.hits += 1
+        return entry
+
+    def put(self, block, html, metadata):
+        if block in self.blocks:
+            self.size -= entry_size(block, self.blocks[block][0])
+        self.blocks[block] = (html, metadata)
+        self.blocks.move_to_end(block)
+        self.size += entry_size(block, html)
+        if self.added is not None:
+            self.added[block] = (html, metadata)
+        while self.size > self.max_bytes and self.blocks:
+            old_block, (old_html, _) = self.blocks.popitem(last=False)
+            self.size -= entry_size(old_block, old_html)
+
+    def track(self):
+        # A worker's copy of the cache reports the blocks it adds, so the
+        # parent can merge them into the cache it saves
+        self.added = {}
+
+    def take_added(self):
+        added = self.added
+        self.added = {}
+        return added
+
+    def merge(self, blocks):
+        for block, (html, metadata) in blocks.items():
+            self.put(block, html, metadata)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __repr__(self):
+        return (
+            f"BlockCache({len(self.blocks)} blocks, {self.size} bytes, "
+            f"{self.hits} hits, {self.misses} misses)"
+        )
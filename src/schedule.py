@@ -0,0 +1,37 @@
+import os
+from state import load_state, save_state
+
+DURATIONS_VERSION = 1
+
+
+class RenderDurations:
+    # Seconds each page took to render in the last build that rendered it,
+    # keyed like the manifest. The file doubles as a --shard-costs input.
+    def __init__(self, path, pages=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        return cls(path, load_state(path, DURATIONS_VERSION).get("pages", {}))
+
+    def save(self):
+        # Pages whose source is gone are dropped
+        self.pages = {
+            page: seconds for page, seconds in self.pages.items() if os.path.exists(page)
+        }
+        save_state(self.path, DURATIONS_VERSION, {"pages": self.pages})
+
+    def record(self, durations):
+        self.pages.update(durations)
+
+    def schedule(self, pages):
+        # Longest first, so the big pages start while the small ones fill the
+        # gaps behind them. Pages without history may be big too and go first.
+        unknown = [page for page in pages if page[0] not in self.pages]
+        known = [page for page in pages if page[0] in self.pages]
+        known.sort(key=lambda page: self.pages[page[0]], reverse=True)
+        return unknown + known
+
+    def __repr__(self):
+        return f"RenderDurations({self.path}, {len(self.pages)} pages)"
@@ -0,0 +1,278 @@
+import argparse
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from main import find_pages, page_title, write_output
+from md_functions import read_document
+from render_cache import BlockCache
+from sync import sync_directory
+from template import Template
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVERELOAD_PATH}")'
+    ".onmessage = () => location.reload();</script>"
+)
+
+
+def scan_tree(path):
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return {path: (stat.st_mtime_ns, stat.st_size)}
+    snapshot = {}
+    if not os.path.isdir(path):
+        return snapshot
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                snapshot.update(scan_tree(entry.path))
+            elif entry.is_file():
+                stat = entry.stat()
+                snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def inject_livereload(html):
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + LIVERELOAD_SCRIPT
+    return html[:index] + LIVERELOAD_SCRIPT + html[index:]
+
+
+class LiveSite:
+    def __init__(
+        self, static_dir, dir_path_content, template_path, dest_dir_path, basepath="/"
+    ):
+        self.static_dir = static_dir
+        self.dir_path_content = dir_path_content
+        self.template_path = template_path
+        self.dest_dir_path = dest_dir_path
+        self.basepath = basepath
+        self.template = None
+        self.pages = {}
+        self.rendered = {}
+        # Re-rendering an edited page only parses the blocks that changed
+        self.block_cache = BlockCache()
+        self.snapshot = {}
+        self.errors = {}
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def scan(self):
+        snapshot = {}
+        for path in [self.static_dir, self.dir_path_content, self.template_path]:
+            snapshot.update(scan_tree(path))
+        return snapshot
+
+    def build(self):
+        self.snapshot = self.scan()
+        self.load_template()
+        sync_directory(self.static_dir, self.dest_dir_path)
+        self.pages = dict(find_pages(self.dir_path_content, self.dest_dir_path))
+        for from_path in self.pages:
+            self.render(from_path)
+
+    def load_template(self):
+        self.template = Template.load(self.template_path, self.basepath)
+
+    def render(self, from_path):
+        with open(from_path) as file:
+            document = read_document(file, self.block_cache)
+        title = page_title(document)
+        self.rendered[from_path] = (title, document.node.to_html())
+        self.write(from_path)
+
+    def write(self, from_path):
+        title, content_html = self.rendered[from_path]
+        html = self.template.render(title, content_html)
+        write_output(self.pages[from_path], lambda file: file.write(html))
+
+    def poll(self):
+        snapshot = self.scan()
+        changed = {
+            path
+            for path in snapshot.keys() | self.snapshot.keys()
+            if snapshot.get(path) != self.snapshot.get(path)
+        }
+        if not changed:
+            return changed
+        failed = self.apply(changed)
+        # Paths that failed keep their old state, so the next poll retries them
+        for path in failed:
+            if path in self.snapshot:
+                snapshot[path] = self.snapshot[path]
+            else:
+                snapshot.pop(path, None)
+        self.snapshot = snapshot
+        applied = changed - failed
+        if applied:
+            with self.changed:
+                self.version += 1
+                self.changed.notify_all()
+        return applied
+
+    def apply(self, changed):
+        # Returns the changed paths that could not be applied. One broken
+        # file must not hold back the rest of the batch.
+        static_prefix = os.path.join(self.static_dir, "")
+        content_prefix = os.path.join(self.dir_path_content, "")
+        static_changes = {path for path in changed if path.startswith(static_prefix)}
+        page_changes = {path for path in changed if path.startswith(content_prefix)}
+        failed = set()
+        # The template goes first, so changed pages are rendered with it
+        template_loaded = self.template_path in changed and self.attempt(
+            self.template_path, self.load_template
+        )
+        if self.template_path in changed and not template_loaded:
+            failed.add(self.template_path)
+
+        if static_changes:
+            if not self.attempt(
+                self.static_dir, sync_directory, self.static_dir, self.dest_dir_path
+            ):
+                failed |= static_changes
+            for path in static_changes - failed:
+                if not os.path.exists(path):
+                    relative = os.path.relpath(path, self.static_dir)
+                    dest_path = os.path.join(self.dest_dir_path, relative)
+                    if not self.attempt(path, self.remove, dest_path):
+                        failed.add(path)
+
+        if page_changes:
+            previous = self.pages
+            self.pages = dict(find_pages(self.dir_path_content, self.dest_dir_path))
+            for path in sorted(page_changes):
+                if path in self.pages:
+                    if not self.attempt(path, self.render, path):
+                        failed.add(path)
+                elif path in previous:
+                    self.rendered.pop(path, None)
+                    if not self.attempt(path, self.remove, previous[path]):
+                        failed.add(path)
+
+        if template_loaded:
+            for from_path in self.rendered:
+                if from_path not in page_changes and not self.attempt(
+                    from_path, self.write, from_path
+                ):
+                    failed.add(self.template_path)
+        return failed
+
+    def attempt(self, path, action, *args):
+        # An error is reported once, not on every poll that retries it
+        try:
+            action(*args)
+        except Exception as error:
+            if self.errors.get(path) != str(error):
+                print(f"Rebuild failed for {path}: {error}")
+            self.errors[path] = str(error)
+            return False
+        self.errors.pop(path, None)
+        return True
+
+    def remove(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def wait_for_change(self, version, timeout):
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def watch(self, interval, stop):
+        while not stop.wait(interval):
+            start = time.perf_counter()
+            try:
+                changed = self.poll()
+            except Exception as error:
+                print(f"Rebuild failed: {error}")
+                continue
+            if changed:
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"Rebuilt {len(changed)} changed file(s) in {elapsed:.1f} ms")
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, site=None, **kwargs):
+        self.site = site
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.site is None:
+            return super().do_GET()
+        url_path = urlsplit(self.path).path
+        if url_path == LIVERELOAD_PATH:
+            return self.stream_reloads()
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and url_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not (path.endswith(".html") and os.path.isfile(path)):
+            return super().do_GET()
+
+        with open(path) as file:
+            body = inject_livereload(file.read()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reloads(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = self.site.version
+        try:
+            while True:
+                latest = self.site.wait_for_change(version, timeout=15)
+                if latest != version:
+                    version = latest
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    # Comment lines keep idle connections from timing out
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+def serve(site, port=8888, watch=False, interval=0.2):
+    site.build()
+    handler = partial(
+        LiveReloadHandler, directory=site.dest_dir_path, site=site if watch else None
+    )
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    stop = threading.Event()
+    if watch:
+        threading.Thread(target=site.watch, args=(interval, stop), daemon=True).start()
+    print(f"Serving {site.dest_dir_path} on http://localhost:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py serve", description="Serve docs/ and optionally rebuild on change."
+    )
+    parser.add_argument(
+        "--watch", action="store_true", help="rebuild and live-reload on change"
+    )
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--interval", type=float, default=0.2, help="polling interval in seconds"
+    )
+    args = parser.parse_args(argv)
+    site = LiveSite("static", "content", "template.html", "docs")
+    serve(site, args.port, args.watch, args.interval)
@@ -0,0 +1,190 @@
+import argparse
+import hashlib
+import json
+import os
+from manifest import file_hash
+from pipeline import OutputReport
+from state import save_state
+from sync import COPY_MODES, copy_file, prune_directory
+
+SHARD_MANIFEST = ".shard-manifest.json"
+SHARD_MANIFEST_VERSION = 1
+MERGE_MANIFEST_PATH = os.path.join(".build", "merge-manifest.json")
+MERGE_MANIFEST_VERSION = 1
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected K/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {value} is out of range")
+    return index, count
+
+
+def shard_key(name):
+    # Stable across machines and Python runs, unlike hash()
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big")
+
+
+def page_name(from_path, dir_path_content):
+    return os.path.relpath(from_path, dir_path_content).replace(os.sep, "/")
+
+
+def assign_shards(names, count, costs=None):
+    # Returns the 0-based shard of every name. Without costs a page keeps its
+    # shard as long as the shard count stays the same. With costs, pages are
+    # dealt longest first to the least loaded shard; pages without history
+    # count as the median known cost. Both only depend on the names and the
+    # costs, so every node computes the same split.
+    if not costs:
+        return {name: shard_key(name) % count for name in names}
+    known = sorted(costs[name] for name in names if name in costs)
+    default = known[len(known) // 2] if known else 1.0
+    loads = [0.0] * count
+    shards = {}
+    for name in sorted(names, key=lambda name: (-costs.get(name, default), shard_key(name))):
+        shard = min(range(count), key=lambda shard: (loads[shard], shard))
+        shards[name] = shard
+        loads[shard] += costs.get(name, default)
+    return shards
+
+
+def select_shard(pages, dir_path_content, shard, costs=None):
+    index, count = shard
+    names = {page_name(page[0], dir_path_content): page for page in pages}
+    shards = assign_shards(names, count, costs)
+    return [names[name] for name in sorted(names) if shards[name] == index - 1]
+
+
+def load_costs(path, dir_path_content):
+    # Accepts a flat {page: seconds} mapping or a --profile JSON report,
+    # whose pages map to per-stage timings
+    with open(path) as file:
+        data = json.load(file)
+    pages = data.get("pages", data)
+    costs = {}
+    for from_path, cost in pages.items():
+        if isinstance(cost, dict):
+            cost = sum(cost.values())
+        costs[page_name(from_path, dir_path_content)] = float(cost)
+    return costs
+
+
+def output_files(dest_dir_path):
+    outputs = []
+    for dirpath, _, filenames in os.walk(dest_dir_path):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, dest_dir_path).replace(os.sep, "/")
+            if name != SHARD_MANIFEST:
+                outputs.append(name)
+    return sorted(outputs)
+
+
+def write_shard_manifest(dest_dir_path, shard, basepath):
+    index, count = shard
+    outputs = {
+        name: file_hash(os.path.join(dest_dir_path, name))
+        for name in output_files(dest_dir_path)
+    }
+    path = os.path.join(dest_dir_path, SHARD_MANIFEST)
+    save_state(
+        path,
+        SHARD_MANIFEST_VERSION,
+        {"shard": index, "shards": count, "basepath": basepath, "outputs": outputs},
+    )
+    return path
+
+
+def load_shard_manifest(shard_dir):
+    path = os.path.join(shard_dir, SHARD_MANIFEST)
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError) as error:
+        raise Exception(f"{shard_dir} has no readable shard manifest: {error}")
+    if manifest.get("version") != SHARD_MANIFEST_VERSION:
+        raise Exception(f"{path} has an unsupported version")
+    return manifest
+
+
+def check_shards(shard_dirs, manifests):
+    problems = []
+    counts = {manifest["shards"] for manifest in manifests}
+    basepaths = {manifest["basepath"] for manifest in manifests}
+    if len(counts) > 1:
+        problems.append(f"shard counts differ: {sorted(counts)}")
+    if len(basepaths) > 1:
+        problems.append(f"basepaths differ: {sorted(basepaths)}")
+    seen = {}
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        index = manifest["shard"]
+        if not 1 <= index <= manifest["shards"]:
+            problems.append(f"{shard_dir} has shard {index} of {manifest['shards']}")
+            continue
+        if index in seen:
+            problems.append(f"shard {index} given twice: {seen[index]} and {shard_dir}")
+        seen[index] = shard_dir
+    if len(counts) == 1:
+        missing = sorted(set(range(1, counts.pop() + 1)) - set(seen))
+        if missing:
+            problems.append(f"missing shards: {missing}")
+
+    owners = {}
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        for name, digest in manifest["outputs"].items():
+            if name in owners:
+                problems.append(f"{name} is produced by both {owners[name]} and {shard_dir}")
+                continue
+            owners[name] = shard_dir
+            if file_hash(os.path.join(shard_dir, name)) != digest:
+                problems.append(f"{os.path.join(shard_dir, name)} does not match its manifest")
+    return owners, problems
+
+
+def merge_shards(shard_dirs, dest_dir_path, manifest_path=MERGE_MANIFEST_PATH, mode="copy"):
+    manifests = [load_shard_manifest(shard_dir) for shard_dir in shard_dirs]
+    owners, problems = check_shards(shard_dirs, manifests)
+    if problems:
+        details = "\n".join(f"  {problem}" for problem in problems)
+        raise Exception(f"cannot merge {len(shard_dirs)} shard(s):\n{details}")
+
+    # Same rules as a full build: identical files are left alone and
+    # anything the shards did not produce is removed
+    report = OutputReport()
+    outputs = {}
+    for name, shard_dir in sorted(owners.items()):
+        source = os.path.join(shard_dir, name)
+        destination = os.path.join(dest_dir_path, *name.split("/"))
+        digest = file_hash(source)
+        written = not os.path.exists(destination) or file_hash(destination) != digest
+        if written:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            copy_file(source, destination, mode)
+        report.add(destination, written)
+        outputs[name] = {"shard": shard_dir, "hash": digest}
+    report.deleted.extend(prune_directory(dest_dir_path, report.outputs()))
+
+    save_state(
+        manifest_path,
+        MERGE_MANIFEST_VERSION,
+        {"shards": list(shard_dirs), "outputs": outputs},
+    )
+    return report
+
+
+def merge_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py merge",
+        description="Combine the outputs of --shard K/N builds into one site.",
+    )
+    parser.add_argument("shard_dirs", nargs="+", metavar="SHARD_DIR")
+    parser.add_argument("--dest", default="docs")
+    parser.add_argument("--manifest", default=MERGE_MANIFEST_PATH)
+    parser.add_argument("--copy-mode", choices=COPY_MODES, default="copy")
+    args = parser.parse_args(argv)
+    report = merge_shards(args.shard_dirs, args.dest, args.manifest, args.copy_mode)
+    print(f"Merged {len(args.shard_dirs)} shards into {args.dest}")
+    print(report.summary())
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TempDirTestCase(unittest.TestCase):
+    # Every test gets its own directory. path, write and read take paths
+    # relative to it; absolute paths pass through os.path.join unchanged.
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def write(self, path, text):
+        path = self.path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def read(self, path):
+        with open(self.path(path)) as file:
+            return file.read()
+
+
+class SiteTestCase(TempDirTestCase):
+    # A two page site, the home page linking to the other, with one static
+    # file, laid out like the real one
+    def setUp(self):
+        super().setUp()
+        self.static = self.path("static")
+        self.content = self.path("content")
+        self.template = self.path("template.html")
+        self.docs = self.path("docs")
+        self.manifest = self.path(".build", "manifest.json")
+        self.graph = self.path(".build", "depgraph.json")
+        self.write(self.template, TEMPLATE)
+        self.write(self.path("static", "index.css"), "body {}")
+        self.write(self.path("content", "index.md"), "# Home\n\n[Tom](/blog/tom)")
+        self.write(self.path("content", "blog", "tom", "index.md"), "# Tom\n\nText")
@@ -0,0 +1,31 @@
+import json
+import os
+from pipeline import replace_file
+
+# The build's JSON state files (manifest, dependency graph, durations, block
+# cache and shard manifests) are saved whole with a format version. A file
+# that is missing, unreadable or of another version reads as empty, so the
+# build starts over instead of trusting it.
+
+
+def load_state(path, version):
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != version:
+        return {}
+    return data
+
+
+def save_state(path, version, data, indent=1):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    replace_file(
+        path,
+        lambda file: json.dump(
+            {"version": version, **data}, file, indent=indent, sort_keys=True
+        ),
+    )
@@ -0,0 +1,123 @@
+import os
+import shutil
+from manifest import file_hash
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+COPY_MODES = ("copy", "hardlink", "reflink")
+# ioctl request number of FICLONE from <linux/fs.h>
+FICLONE = 0x40049409
+
+
+def sync_directory(
+    source, destination, manifest=None, checksum=False, mode="copy", report=None
+):
+    copied = []
+    with os.scandir(source) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            destination_path = os.path.join(destination, entry.name)
+            if entry.is_dir():
+                copied.extend(
+                    sync_directory(
+                        entry.path, destination_path, manifest, checksum, mode, report
+                    )
+                )
+                continue
+            if not entry.is_file():
+                continue
+
+            stat = entry.stat()
+            if manifest is not None:
+                record = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime_ns,
+                    "dest": destination_path,
+                }
+                manifest.record(entry.path, record)
+            if is_current(entry.path, stat, destination_path, checksum):
+                if report is not None:
+                    report.add(destination_path, False)
+                continue
+            os.makedirs(destination, exist_ok=True)
+            copy_file(entry.path, destination_path, mode)
+            copied.append(destination_path)
+            if report is not None:
+                report.add(destination_path, True)
+    return copied
+
+
+def prune_directory(directory, keep):
+    # Removes every file under directory that is not in keep, then any
+    # directories left empty, and returns the removed files
+    keep = {os.path.normpath(path) for path in keep}
+    removed = []
+    for dirpath, _, filenames in os.walk(directory, topdown=False):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if os.path.normpath(path) not in keep:
+                os.remove(path)
+                removed.append(path)
+        if dirpath != directory and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+
+def is_current(source_path, source_stat, destination_path, checksum=False):
+    try:
+        destination_stat = os.stat(destination_path)
+    except FileNotFoundError:
+        return False
+    if destination_stat.st_size != source_stat.st_size:
+        return False
+    if destination_stat.st_mtime_ns == source_stat.st_mtime_ns:
+        return True
+    if checksum and file_hash(source_path) == file_hash(destination_path):
+        os.utime(
+            destination_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns)
+        )
+        return True
+    return False
+
+
+def copy_file(source_path, destination_path, mode="copy"):
+    if mode not in COPY_MODES:
+        raise ValueError(f"invalid copy mode {mode}")
+    # Never write through a previous hardlink into the source tree
+    if os.path.lexists(destination_path):
+        os.remove(destination_path)
+
+    if mode == "hardlink":
+        try:
+            os.link(source_path, destination_path)
+            return
+        except OSError:
+            pass
+    elif mode == "reflink" and clone_file(source_path, destination_path):
+        shutil.copystat(source_path, destination_path)
+        return
+    shutil.copy2(source_path, destination_path)
+
+
+def clone_file(source_path, destination_path):
+    with open(source_path, "rb") as source, open(destination_path, "wb") as destination:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+                return True
+            except OSError:
+                pass
+        if not hasattr(os, "copy_file_range"):
+            return False
+        remaining = os.fstat(source.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(source.fileno(), destination.fileno(), remaining)
+                if copied == 0:
+                    return False
+                remaining -= copied
+        except OSError:
+            return False
+    return True
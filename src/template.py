@@ -0,0 +1,88 @@
+from re import split
+
+TITLE_SLOT = "{{ Title }}"
+CONTENT_SLOT = "{{ Content }}"
+ROOT_PREFIXES = ('href="/', 'src="/')
+
+
+def split_template(template):
+    return [
+        segment
+        for segment in split(r"(\{\{ Title \}\}|\{\{ Content \}\})", template)
+        if segment != ""
+    ]
+
+
+def rewrite_basepath(html, basepath):
+    for prefix in ROOT_PREFIXES:
+        html = html.replace(prefix, prefix[:-1] + basepath)
+    return html
+
+
+class BasepathWriter:
+    def __init__(self, out, basepath):
+        self.out = out
+        self.basepath = basepath
+        self.pending = ""
+
+    def write(self, text):
+        text = self.pending + text
+        keep = self.partial_prefix_length(text)
+        self.pending = text[len(text) - keep :]
+        self.out.write(rewrite_basepath(text[: len(text) - keep], self.basepath))
+
+    def flush(self):
+        self.out.write(rewrite_basepath(self.pending, self.basepath))
+        self.pending = ""
+
+    @staticmethod
+    def partial_prefix_length(text):
+        # A root-relative attribute may be split across two writes, so hold
+        # back any tail that could still become one of the prefixes.
+        for length in range(max(map(len, ROOT_PREFIXES)) - 1, 0, -1):
+            tail = text[-length:]
+            if any(prefix.startswith(tail) for prefix in ROOT_PREFIXES):
+                return length
+        return 0
+
+
+class Template:
+    def __init__(self, text, basepath="/", path=None):
+        self.path = path
+        self.basepath = basepath
+        self.segments = [
+            segment
+            if segment in (TITLE_SLOT, CONTENT_SLOT)
+            else rewrite_basepath(segment, basepath)
+            for segment in split_template(text)
+        ]
+
+    @classmethod
+    def load(cls, path, basepath="/"):
+        with open(path) as file:
+            return cls(file.read(), basepath, path)
+
+    def render(self, title, content_html):
+        slots = {
+            TITLE_SLOT: rewrite_basepath(title, self.basepath),
+            CONTENT_SLOT: rewrite_basepath(content_html, self.basepath),
+        }
+        return "".join(slots.get(segment, segment) for segment in self.segments)
+
+    def write(self, out, title, write_content):
+        # write_content(out) writes the content HTML in as many pieces as it
+        # likes, so a page never has to be held whole
+        writer = BasepathWriter(out, self.basepath) if self.basepath != "/" else None
+        for segment in self.segments:
+            if segment == TITLE_SLOT:
+                (writer or out).write(title)
+            elif segment == CONTENT_SLOT:
+                write_content(writer or out)
+            else:
+                out.write(segment)
+                continue
+            if writer:
+                writer.flush()
+
+    def __repr__(self):
+        return f"Template({self.path}, {self.basepath}, {len(self.segments)} segments)"
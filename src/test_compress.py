@@ -0,0 +1,84 @@
+import gzip
+import os
+import unittest
+from unittest.mock import Mock, patch
+from compress import compress_file, siblings, update_siblings
+from pipeline import OutputReport
+from site_fixture import TempDirTestCase
+
+
+class TestCompress(TempDirTestCase):
+    def read_bytes(self, path):
+        with open(path, "rb") as file:
+            return file.read()
+
+    @patch("compress.brotli", None)
+    def test_compress_file(self):
+        path = self.write("index.html", "<p>hello</p>" * 100)
+        self.write("index.html.br", "stale")
+        self.assertEqual(compress_file(path), [f"{path}.gz"])
+        self.assertEqual(
+            gzip.decompress(self.read_bytes(f"{path}.gz")), self.read_bytes(path)
+        )
+        self.assertFalse(os.path.exists(f"{path}.br"))
+
+    @patch("compress.brotli", None)
+    def test_compress_file_is_deterministic(self):
+        path = self.write("index.html", "<p>hello</p>")
+        compress_file(path)
+        first = self.read_bytes(f"{path}.gz")
+        compress_file(path)
+        self.assertEqual(self.read_bytes(f"{path}.gz"), first)
+
+    def test_compress_file_brotli(self):
+        brotli = Mock()
+        brotli.compress.return_value = b"br"
+        path = self.write("index.css", "body {}")
+        with patch("compress.brotli", brotli):
+            self.assertEqual(compress_file(path), [f"{path}.gz", f"{path}.br"])
+        brotli.compress.assert_called_once_with(b"body {}", quality=11)
+        self.assertEqual(self.read_bytes(f"{path}.br"), b"br")
+
+    @patch("compress.brotli", None)
+    def test_update_siblings(self):
+        written = self.write("new.html", "new")
+        unchanged = self.write("same.html", "same")
+        compressed = self.write("done.html", "done")
+        compress_file(compressed)
+        image = self.write("image.png", "png")
+        deleted = self.path("gone.html")
+        self.write("gone.html.gz", "old")
+
+        report = OutputReport()
+        for path in (written, image):
+            report.add(path, True)
+        for path in (unchanged, compressed):
+            report.add(path, False)
+        report.deleted.append(deleted)
+        self.assertEqual(
+            sorted(update_siblings(report, compress=True, workers=2)),
+            [f"{written}.gz", f"{unchanged}.gz"],
+        )
+        self.assertFalse(os.path.exists(f"{image}.gz"))
+        self.assertFalse(os.path.exists(f"{deleted}.gz"))
+
+    @patch("compress.brotli", None)
+    def test_update_siblings_without_compress(self):
+        written = self.write("new.html", "new")
+        unchanged = self.write("same.html", "same")
+        compress_file(written)
+        compress_file(unchanged)
+        report = OutputReport()
+        report.add(written, True)
+        report.add(unchanged, False)
+        self.assertEqual(update_siblings(report), [])
+        self.assertFalse(os.path.exists(f"{written}.gz"))
+        self.assertTrue(os.path.exists(f"{unchanged}.gz"))
+
+    @patch("compress.brotli", None)
+    def test_siblings(self):
+        self.assertEqual(siblings(["a.html", "b.css", "c.png"]), {"a.html.gz", "b.css.gz"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import io
+import os
+import threading
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+import client
+from daemon import BuildDaemon, DaemonServer
+from main import parse_args
+from site_fixture import SiteTestCase
+
+
+class TestBuildDaemon(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.builder = self.daemon(["--cache-dir", self.path(".build", "cache")])
+
+    def daemon(self, argv):
+        return BuildDaemon(
+            parse_args(argv),
+            self.static,
+            self.content,
+            self.template,
+            self.docs,
+            self.manifest,
+            self.graph,
+            self.path(".build", "durations.json"),
+        )
+
+    def test_build(self):
+        response = self.builder.handle({"command": "build"})
+        self.assertTrue(response["ok"])
+        self.assertIn("Outputs: 3 written, 0 unchanged, 0 deleted", response["output"])
+        self.assertEqual(
+            self.read(self.path("docs", "blog", "tom", "index.html")),
+            "<title>Tom</title><main><div><h1>Tom</h1><p>Text</p></div></main>",
+        )
+        response = self.builder.handle({"command": "build"})
+        self.assertIn("Outputs: 0 written, 3 unchanged, 0 deleted", response["output"])
+
+    def test_build_reloads_changed_template(self):
+        self.builder.handle({"command": "build"})
+        self.write(self.template, "<h2>{{ Title }}</h2>")
+        self.builder.handle({"command": "build"})
+        self.assertEqual(self.read(self.path("docs", "index.html")), "<h2>Home</h2>")
+
+    def test_requests_evict_render_cache(self):
+        builder = self.daemon(
+            ["--cache", "--cache-dir", self.path(".build", "cache"), "--cache-size", "0"]
+        )
+        with patch.object(builder.cache, "evict") as evict:
+            builder.handle({"command": "build"})
+            builder.handle({"command": "status"})
+        evict.assert_called_once_with()
+        builder.handle({"command": "build"})
+        self.assertEqual(list(builder.cache.entries()), [])
+
+    def test_render(self):
+        self.builder.handle({"command": "build"})
+        tom = self.path("content", "blog", "tom", "index.md")
+        self.write(tom, "# Tom again")
+        response = self.builder.handle({"command": "render", "pages": [tom]})
+        self.assertTrue(response["ok"], response)
+        self.assertIn("Outputs: 1 written", response["output"])
+        self.assertEqual(
+            self.read(self.path("docs", "blog", "tom", "index.html")),
+            "<title>Tom again</title><main><div><h1>Tom again</h1></div></main>",
+        )
+        # The rendered page is recorded, so the next build leaves it alone
+        response = self.builder.handle({"command": "build"})
+        self.assertIn("0 pages rendered", response["output"])
+
+    def test_render_failure_removes_output(self):
+        self.builder.handle({"command": "build"})
+        tom = self.path("content", "blog", "tom", "index.md")
+        self.write(tom, "no title")
+        response = self.builder.handle({"command": "render", "pages": [tom]})
+        self.assertFalse(response["ok"])
+        self.assertFalse(os.path.exists(self.path("docs", "blog", "tom", "index.html")))
+        self.assertNotIn(tom, self.builder.manifest.entries)
+
+    def test_render_fingerprints_current_inputs(self):
+        self.builder.handle({"command": "build"})
+        image = self.path("static", "tom.png")
+        self.write(image, "png")
+        # Left over from an earlier request, before the image was added
+        self.builder.graph.fingerprints[("assets", image)] = None
+        tom = self.path("content", "blog", "tom", "index.md")
+        self.write(tom, "# Tom\n\n![Tom](/tom.png)")
+        response = self.builder.handle({"command": "render", "pages": [tom]})
+        self.assertTrue(response["ok"], response)
+        stat = os.stat(image)
+        self.assertEqual(
+            self.builder.graph.inputs["assets"][image],
+            [stat.st_size, stat.st_mtime_ns],
+        )
+
+    def test_render_unknown_page(self):
+        response = self.builder.handle(
+            {"command": "render", "pages": [self.path("content", "missing.md")]}
+        )
+        self.assertFalse(response["ok"])
+        self.assertIn("not a content page", response["error"])
+
+    def test_unknown_command(self):
+        response = self.builder.handle({"command": "explode"})
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["error"], "unknown command 'explode'")
+
+    def test_socket_round_trip(self):
+        socket_path = self.path("daemon.sock")
+        with DaemonServer(socket_path, self.builder) as server:
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                response = client.request(socket_path, {"command": "build"})
+                self.assertTrue(response["ok"])
+                self.assertTrue(os.path.exists(self.path("docs", "index.html")))
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    status = client.main(["--socket", socket_path, "status"])
+                self.assertEqual(status, 0)
+                self.assertIn("2 pages in the dependency graph", output.getvalue())
+                with redirect_stdout(io.StringIO()):
+                    client.main(["--socket", socket_path, "stop"])
+                thread.join(5)
+                self.assertFalse(thread.is_alive())
+            finally:
+                server.shutdown()
+                thread.join()
+
+    def test_client_without_daemon(self):
+        with redirect_stderr(io.StringIO()) as error:
+            status = client.main(["--socket", self.path("missing.sock"), "status"])
+        self.assertEqual(status, 2)
+        self.assertIn("cannot reach build daemon", error.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import unittest
+from depgraph import DependencyGraph, resolve_asset, resolve_link
+from site_fixture import SiteTestCase
+
+
+class TestDependencyGraph(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.path("static", "images", "a.png"), "a")
+        self.write(self.path("content", "blog", "post", "index.md"), "# Post")
+        self.write(self.path("content", "about.md"), "# About")
+
+    def record(self, graph, page, images=(), links=()):
+        metadata = {"images": list(images), "links": list(links)}
+        graph.record(page, self.template, metadata, self.static, self.content)
+
+    def test_resolve_asset(self):
+        self.assertEqual(
+            resolve_asset("/images/a.png", self.static),
+            self.path("static", "images", "a.png"),
+        )
+        self.assertIsNone(resolve_asset("https://example.com/a.png", self.static))
+        self.assertIsNone(resolve_asset("//example.com/a.png", self.static))
+
+    def test_resolve_link(self):
+        self.assertEqual(
+            resolve_link("/", self.static, self.content),
+            self.path("content", "index.md"),
+        )
+        self.assertEqual(
+            resolve_link("/blog/post#top", self.static, self.content),
+            self.path("content", "blog", "post", "index.md"),
+        )
+        self.assertEqual(
+            resolve_link("/about.html", self.static, self.content),
+            self.path("content", "about.md"),
+        )
+        self.assertEqual(
+            resolve_link("/about", self.static, self.content),
+            self.path("content", "about.md"),
+        )
+        self.assertEqual(
+            resolve_link("/images/a.png", self.static, self.content),
+            self.path("static", "images", "a.png"),
+        )
+        self.assertEqual(
+            resolve_link("/missing", self.static, self.content),
+            self.path("content", "missing", "index.md"),
+        )
+        self.assertIsNone(resolve_link("https://example.com", self.static, self.content))
+
+    def test_record(self):
+        graph = DependencyGraph(self.path("depgraph.json"))
+        page = self.path("content", "index.md")
+        self.record(
+            graph,
+            page,
+            images=[("A", "/images/a.png"), ("Remote", "https://example.com/b.png")],
+            links=[("Self", "/"), ("Post", "/blog/post")],
+        )
+        self.assertEqual(
+            graph.pages[page],
+            {
+                "template": self.template,
+                "assets": [self.path("static", "images", "a.png")],
+                "links": [self.path("content", "blog", "post", "index.md")],
+            },
+        )
+
+    def test_affected(self):
+        path = self.path(".build", "depgraph.json")
+        graph = DependencyGraph(path)
+        index = self.path("content", "index.md")
+        about = self.path("content", "about.md")
+        self.record(graph, index, images=[("A", "/images/a.png")])
+        self.record(graph, about, links=[("New", "/new")])
+        graph.save()
+
+        self.assertEqual(DependencyGraph.load(path).affected(), set())
+
+        self.write(self.path("static", "images", "a.png"), "changed")
+        self.assertEqual(DependencyGraph.load(path).affected(), {index})
+
+        self.write(self.path("content", "new", "index.md"), "# New")
+        self.assertEqual(DependencyGraph.load(path).affected(), {index, about})
+
+    def test_template_change_affects_all_pages(self):
+        path = self.path("depgraph.json")
+        graph = DependencyGraph(path)
+        pages = [self.path("content", "index.md"), self.path("content", "about.md")]
+        for page in pages:
+            self.record(graph, page)
+        graph.save()
+        self.write(self.template, "<main>{{ Content }}</main>")
+        graph = DependencyGraph.load(path)
+        self.assertEqual(graph.changed_inputs(), [("template", self.template)])
+        self.assertEqual(graph.affected(), set(pages))
+
+    def test_is_current(self):
+        graph = DependencyGraph(self.path("depgraph.json"))
+        page = self.path("content", "index.md")
+        self.assertFalse(graph.is_current(page, self.template, set()))
+        self.record(graph, page)
+        self.assertTrue(graph.is_current(page, self.template, set()))
+        self.assertFalse(graph.is_current(page, self.path("other.html"), set()))
+        self.assertFalse(graph.is_current(page, self.template, {page}))
+
+    def test_retain(self):
+        graph = DependencyGraph(self.path("depgraph.json"))
+        index = self.path("content", "index.md")
+        about = self.path("content", "about.md")
+        self.record(graph, index)
+        self.record(graph, about)
+        graph.retain([index])
+        self.assertEqual(list(graph.pages), [index])
+
+    def test_load_corrupt(self):
+        path = self.path("depgraph.json")
+        self.write(path, "{not json")
+        self.assertEqual(DependencyGraph.load(path).pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
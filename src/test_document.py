@@ -0,0 +1,38 @@
+import unittest
+from document import Document
+from textnode import TextNode, TextType
+
+
+class TestDocument(unittest.TestCase):
+    def test_title_from_first_h1(self):
+        document = Document()
+        document.add_heading(2, "Intro")
+        document.add_heading(1, " Title ")
+        document.add_heading(1, "Second")
+        self.assertEqual(document.title, "Title")
+        self.assertEqual(document.headings, [(2, "Intro"), (1, " Title "), (1, "Second")])
+
+    def test_add_text_nodes(self):
+        document = Document()
+        document.add_text_nodes(
+            [
+                TextNode("Some words ", TextType.TEXT),
+                TextNode("bold", TextType.BOLD),
+                TextNode("a link", TextType.LINK, "/blog"),
+                TextNode("an image", TextType.IMAGE, "/a.png"),
+            ]
+        )
+        self.assertEqual(document.links, [("a link", "/blog")])
+        self.assertEqual(document.images, [("an image", "/a.png")])
+        self.assertEqual(document.word_count, 5)
+
+    def test_metadata_round_trip(self):
+        document = Document(
+            None, "Title", [(1, "Title")], [("a", "/a")], [("b", "/b.png")], 3
+        )
+        restored = Document.from_metadata(document.metadata())
+        self.assertEqual(restored.metadata(), document.metadata())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from io import StringIO
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
 
@@ -161,6 +162,42 @@ class TestHTMLNode(unittest.TestCase):
             "<div><span><b>grandchild1</b><b>grandchild2</b></span><span>child2</span>child3</div>",
         )
 
+    def test_to_html_not_implemented(self):
+        node = HTMLNode("div", "Welcome to the site!")
+        with self.assertRaises(NotImplementedError):
+            node.to_html()
+
+    def test_write_html(self):
+        parent_node = ParentNode(
+            "ul", [ParentNode("li", [LeafNode("b", "item")]), LeafNode(None, "tail")]
+        )
+        out = StringIO()
+        out.write("<body>")
+        parent_node.write_html(out)
+        self.assertEqual(
+            out.getvalue(), "<body><ul><li><b>item</b></li>tail</ul>"
+        )
+
+    def test_to_html_wide_and_deep(self):
+        items = [ParentNode("li", [LeafNode(None, str(i))]) for i in range(5000)]
+        node = ParentNode("ul", items)
+        for _ in range(200):
+            node = ParentNode("div", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<div>" * 200 + "<ul><li>0</li>"))
+        self.assertTrue(html.endswith("<li>4999</li></ul>" + "</div>" * 200))
+
+    def test_nodes_are_slotted(self):
+        for node in [HTMLNode("p"), LeafNode("b", "bold"), ParentNode("p", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+            with self.assertRaises(AttributeError):
+                node.extra = True
+
+    def test_empty_props_are_shared(self):
+        self.assertIsNone(LeafNode("a", "Click me!", {}).props)
+        self.assertIsNone(ParentNode("div", [], {}).props)
+        self.assertEqual(LeafNode("a", "x", {"href": "/"}).props, {"href": "/"})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,21 @@
+import gzip
+import io
+import os
 import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
 from main import (
-    extract_titel
+    main,
+    extract_titel,
+    find_pages,
+    build_full,
+    build_incremental,
+    generate_pages_recursive,
 )
+from profiler import BuildProfile
+from render_cache import BlockCache, RenderCache
+from schedule import RenderDurations
+from site_fixture import SiteTestCase
 
 class TestFunctions(unittest.TestCase):
     def test_extract_titel(self):
@@ -10,4 +24,275 @@ class TestFunctions(unittest.TestCase):
         with self.assertRaises(Exception):
             heading = extract_titel("## This is not a h1 heading")
 
-        
+    def test_extract_titel_uses_first_h1(self):
+        self.assertEqual(extract_titel("\n\n#  Title  \n\ntext"), "Title")
+        self.assertEqual(extract_titel("Intro\n\n# Title\n\n# Second"), "Title")
+        with self.assertRaises(Exception):
+            extract_titel("Intro\n\n## Subtitle")
+
+
+class TestBuild(SiteTestCase):
+    def build(self, basepath="/", cache=None):
+        return build_incremental(
+            self.static,
+            self.content,
+            self.template,
+            self.docs,
+            basepath,
+            self.manifest,
+            self.graph,
+            cache=cache,
+        )
+
+    def test_find_pages(self):
+        self.assertEqual(
+            find_pages(self.content, self.docs),
+            [
+                (self.path("content", "blog", "tom", "index.md"), self.path("docs", "blog", "tom", "index.html")),
+                (self.path("content", "index.md"), self.path("docs", "index.html")),
+            ],
+        )
+
+    def test_build_incremental(self):
+        self.build("/site/")
+        self.assertEqual(
+            self.read(self.path("docs", "index.html")),
+            '<title>Home</title><main><div><h1>Home</h1><p><a href="/site/blog/tom">Tom</a></p></div></main>',
+        )
+        self.assertEqual(self.read(self.path("docs", "index.css")), "body {}")
+        self.assertTrue(os.path.exists(self.manifest))
+
+    def test_build_incremental_skips_unchanged(self):
+        self.build()
+        tom = self.path("docs", "blog", "tom", "index.html")
+        self.write(tom, "untouched")
+        self.write(self.path("content", "index.md"), "# Changed")
+        self.build()
+        self.assertEqual(self.read(tom), "untouched")
+        self.assertIn("<h1>Changed</h1>", self.read(self.path("docs", "index.html")))
+
+    def test_build_incremental_template_change(self):
+        self.build()
+        self.write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.build()
+        self.assertTrue(
+            self.read(self.path("docs", "blog", "tom", "index.html")).startswith("<h2>Tom</h2>")
+        )
+
+    def test_build_incremental_removes_deleted_sources(self):
+        self.build()
+        os.remove(self.path("content", "blog", "tom", "index.md"))
+        os.remove(self.path("static", "index.css"))
+        self.build()
+        self.assertFalse(os.path.exists(self.path("docs", "blog", "tom", "index.html")))
+        self.assertFalse(os.path.exists(self.path("docs", "index.css")))
+        self.assertTrue(os.path.exists(self.path("docs", "index.html")))
+
+    def test_build_incremental_asset_change(self):
+        self.write(self.path("static", "images", "tom.png"), "tom")
+        self.write(self.path("content", "blog", "tom", "index.md"), "# Tom\n\n![Tom](/images/tom.png)")
+        self.build()
+        index = self.path("docs", "index.html")
+        tom = self.path("docs", "blog", "tom", "index.html")
+        self.write(index, "untouched")
+        self.write(tom, "untouched")
+        self.write(self.path("static", "images", "tom.png"), "new tom")
+        self.build()
+        self.assertEqual(self.read(index), "untouched")
+        self.assertIn('<img src="/images/tom.png"', self.read(tom))
+
+    def test_build_incremental_linked_page_added(self):
+        self.write(self.path("content", "about.md"), "# About\n\n[Contact](/contact)")
+        self.build()
+        index = self.path("docs", "index.html")
+        about = self.path("docs", "about.html")
+        self.write(index, "untouched")
+        self.write(about, "untouched")
+        self.write(self.path("content", "contact", "index.md"), "# Contact")
+        self.build()
+        self.assertEqual(self.read(index), "untouched")
+        self.assertIn("<h1>About</h1>", self.read(about))
+
+    def test_build_incremental_removes_failed_output(self):
+        self.build()
+        tom = self.path("docs", "blog", "tom", "index.html")
+        self.write(self.path("content", "blog", "tom", "index.md"), "no title")
+        with self.assertRaises(Exception):
+            self.build()
+        self.assertFalse(os.path.exists(tom))
+        self.assertTrue(os.path.exists(self.path("docs", "index.html")))
+        self.write(self.path("content", "blog", "tom", "index.md"), "# Tom\n\nText")
+        self.build()
+        self.assertIn("<h1>Tom</h1>", self.read(tom))
+
+    def test_build_full_invalidates_incremental_records(self):
+        index = self.path("content", "index.md")
+        self.build()
+        self.write(index, "# Version 2")
+        build_full(
+            self.static,
+            self.content,
+            self.template,
+            self.docs,
+            "/",
+            manifest_path=self.manifest,
+            graph_path=self.graph,
+        )
+        self.assertFalse(os.path.exists(self.manifest))
+        self.assertFalse(os.path.exists(self.graph))
+        self.write(index, "# Home\n\n[Tom](/blog/tom)")
+        self.build()
+        self.assertIn("<h1>Home</h1>", self.read(self.path("docs", "index.html")))
+
+    def test_main_reports_and_saves_after_failed_pages(self):
+        self.write(self.path("content", "blog", "tom", "index.md"), "no title")
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        out = io.StringIO()
+        try:
+            with patch("sys.argv", ["main.py", "--cache"]), redirect_stdout(out):
+                with self.assertRaises(Exception):
+                    main()
+        finally:
+            os.chdir(cwd)
+        self.assertIn("Outputs: 2 written", out.getvalue())
+        self.assertTrue(os.path.exists(self.path(".build", "durations.json")))
+        self.assertTrue(os.path.exists(self.path(".build", "cache", "blocks.json")))
+
+    def test_build_full_keeps_identical_outputs(self):
+        build_full(self.static, self.content, self.template, self.docs, "/")
+        index = self.path("docs", "index.html")
+        tom = self.path("docs", "blog", "tom", "index.html")
+        os.utime(index, ns=(0, 0))
+        os.utime(tom, ns=(0, 0))
+        self.write(self.path("docs", "old", "index.html"), "removed page")
+        self.write(self.path("content", "blog", "tom", "index.md"), "# Tom\n\nMore text")
+        report = build_full(self.static, self.content, self.template, self.docs, "/")
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+        self.assertNotEqual(os.stat(tom).st_mtime_ns, 0)
+        self.assertEqual(report.written, [tom])
+        self.assertEqual(sorted(report.unchanged), [self.path("docs", "index.css"), index])
+        self.assertEqual(report.deleted, [self.path("docs", "old", "index.html")])
+        self.assertFalse(os.path.exists(self.path("docs", "old")))
+
+    def test_build_full_failure_keeps_other_outputs(self):
+        build_full(self.static, self.content, self.template, self.docs, "/", compress=True)
+        old = self.path("docs", "old", "index.html")
+        self.write(old, "removed page")
+        tom = self.path("docs", "blog", "tom", "index.html")
+        self.write(self.path("content", "blog", "tom", "index.md"), "no title")
+        with self.assertRaises(Exception):
+            build_full(self.static, self.content, self.template, self.docs, "/", compress=True)
+        self.assertFalse(os.path.exists(tom))
+        self.assertFalse(os.path.exists(f"{tom}.gz"))
+        self.assertTrue(os.path.exists(old))
+        self.assertTrue(os.path.exists(self.path("docs", "index.html.gz")))
+
+        # Errors outside the render pass remove nothing
+        os.remove(self.template)
+        with self.assertRaises(Exception):
+            build_full(self.static, self.content, self.template, self.docs, "/")
+        self.assertTrue(os.path.exists(old))
+        self.assertTrue(os.path.exists(self.path("docs", "index.html")))
+
+    def test_build_full_compress(self):
+        build_full(self.static, self.content, self.template, self.docs, "/", compress=True)
+        index = self.path("docs", "index.html")
+        with gzip.open(f"{index}.gz", "rt") as file:
+            self.assertEqual(file.read(), self.read(index))
+        self.assertTrue(os.path.exists(self.path("docs", "index.css.gz")))
+        report = build_full(self.static, self.content, self.template, self.docs, "/", compress=True)
+        self.assertEqual(report.compressed, [])
+        self.assertTrue(os.path.exists(f"{index}.gz"))
+        build_full(self.static, self.content, self.template, self.docs, "/")
+        self.assertFalse(os.path.exists(f"{index}.gz"))
+
+    def test_generate_pages_recursive_parallel(self):
+        serial = self.path("serial")
+        generate_pages_recursive(self.content, self.template, serial, "/", jobs=1)
+        generate_pages_recursive(self.content, self.template, self.docs, "/", jobs=2)
+        for _, dest_path in find_pages(self.content, serial):
+            parallel_path = os.path.join(self.docs, os.path.relpath(dest_path, serial))
+            self.assertEqual(self.read(dest_path), self.read(parallel_path))
+
+    def test_generate_pages_recursive_reports_all_failures(self):
+        self.write(self.path("content", "a.md"), "no title")
+        self.write(self.path("content", "b.md"), "## still no title")
+        with self.assertRaises(Exception) as context:
+            generate_pages_recursive(self.content, self.template, self.docs, "/", jobs=2)
+        message = str(context.exception)
+        self.assertIn("2 page(s) failed", message)
+        self.assertIn("a.md", message)
+        self.assertIn("b.md", message)
+        self.assertTrue(os.path.exists(self.path("docs", "index.html")))
+
+    def test_build_incremental_render_cache(self):
+        cache = RenderCache(self.path(".build", "cache"))
+        self.build(cache=cache)
+        self.write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        with patch("main.markdown_to_html") as markdown_to_html:
+            self.build(cache=cache)
+        markdown_to_html.assert_not_called()
+        self.assertEqual(
+            self.read(self.path("docs", "blog", "tom", "index.html")),
+            "<h2>Tom</h2><div><h1>Tom</h1><p>Text</p></div>",
+        )
+
+    def test_generate_pages_recursive_streams_large_pages(self):
+        serial = self.path("serial")
+        generate_pages_recursive(self.content, self.template, serial, "/basepath/")
+        # No HTMLNode tree is built for a streamed page
+        with patch("pipeline.STREAM_BYTES", 0), patch(
+            "main.render_markdown", side_effect=AssertionError
+        ), patch("md_functions.block_to_html_node", side_effect=AssertionError):
+            generate_pages_recursive(
+                self.content, self.template, self.docs, "/basepath/"
+            )
+        for _, dest_path in find_pages(self.content, serial):
+            streamed_path = os.path.join(self.docs, os.path.relpath(dest_path, serial))
+            self.assertEqual(self.read(dest_path), self.read(streamed_path))
+
+    def test_generate_pages_recursive_parallel_fills_block_cache(self):
+        block_cache = BlockCache()
+        generate_pages_recursive(
+            self.content, self.template, self.docs, "/", jobs=2, block_cache=block_cache
+        )
+        self.assertIn("Text", block_cache.blocks)
+        self.assertIn("# Tom", block_cache.blocks)
+
+    def test_generate_pages_recursive_durations(self):
+        durations = RenderDurations(self.path(".build", "durations.json"))
+        pages = find_pages(self.content, self.docs)
+        generate_pages_recursive(
+            self.content, self.template, self.docs, "/", jobs=2, durations=durations
+        )
+        self.assertEqual(sorted(durations.pages), sorted(page for page, _ in pages))
+        durations.save()
+        self.assertEqual(
+            RenderDurations.load(durations.path).pages, durations.pages
+        )
+
+    def test_render_cache_hit_keeps_stored_duration(self):
+        cache = RenderCache(self.path(".build", "cache"))
+        durations = RenderDurations(self.path(".build", "durations.json"))
+        generate_pages_recursive(
+            self.content, self.template, self.docs, "/", cache=cache, durations=durations
+        )
+        index = self.path("content", "index.md")
+        durations.pages[index] = 5.0
+        generate_pages_recursive(
+            self.content, self.template, self.docs, "/", cache=cache, durations=durations
+        )
+        self.assertEqual(durations.pages[index], 5.0)
+
+    def test_generate_pages_recursive_profile(self):
+        profile = BuildProfile()
+        generate_pages_recursive(
+            self.content, self.template, self.docs, "/", jobs=2, profile=profile
+        )
+        self.assertEqual(sorted(profile.pages), [page for page, _ in find_pages(self.content, self.docs)])
+        self.assertIn("inline parsing", profile.totals())
+        self.assertEqual(
+            self.read(self.path("docs", "blog", "tom", "index.html")),
+            "<title>Tom</title><main><div><h1>Tom</h1><p>Text</p></div></main>",
+        )
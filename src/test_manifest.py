@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from manifest import Manifest, file_hash
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_file_hash(self):
+        a = self.write("a.md", "# Hello")
+        b = self.write("b.md", "# Hello")
+        c = self.write("c.md", "# World")
+        self.assertEqual(file_hash(a), file_hash(b))
+        self.assertNotEqual(file_hash(a), file_hash(c))
+
+    def test_load_missing(self):
+        manifest = Manifest.load(os.path.join(self.dir, "missing.json"))
+        self.assertEqual(manifest.entries, {})
+
+    def test_load_corrupt(self):
+        path = self.write("manifest.json", "{not json")
+        self.assertEqual(Manifest.load(path).entries, {})
+
+    def test_save_and_load(self):
+        path = os.path.join(self.dir, "nested", "manifest.json")
+        dest = self.write("index.html", "<html></html>")
+        manifest = Manifest(path)
+        manifest.record("content/index.md", {"hash": "abc", "dest": dest})
+        manifest.save()
+        loaded = Manifest.load(path)
+        self.assertEqual(loaded.entries, {"content/index.md": {"hash": "abc", "dest": dest}})
+
+    def test_is_fresh(self):
+        dest = self.write("index.html", "<html></html>")
+        manifest = Manifest(os.path.join(self.dir, "manifest.json"))
+        manifest.record("content/index.md", {"hash": "abc", "dest": dest})
+        self.assertTrue(manifest.is_fresh("content/index.md", {"hash": "abc", "dest": dest}))
+        self.assertFalse(manifest.is_fresh("content/index.md", {"hash": "def", "dest": dest}))
+        self.assertFalse(manifest.is_fresh("content/new.md", {"hash": "abc", "dest": dest}))
+
+    def test_is_fresh_missing_output(self):
+        dest = os.path.join(self.dir, "index.html")
+        manifest = Manifest(os.path.join(self.dir, "manifest.json"))
+        manifest.record("content/index.md", {"hash": "abc", "dest": dest})
+        self.assertFalse(manifest.is_fresh("content/index.md", {"hash": "abc", "dest": dest}))
+
+    def test_remove_stale(self):
+        kept = self.write("kept.html", "kept")
+        gone = self.write("gone.html", "gone")
+        manifest = Manifest(
+            os.path.join(self.dir, "manifest.json"),
+            {"kept.md": {"hash": "a", "dest": kept}, "gone.md": {"hash": "b", "dest": gone}},
+        )
+        manifest.is_fresh("kept.md", {"hash": "a", "dest": kept})
+        self.assertEqual(manifest.remove_stale(), [gone])
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(gone))
+        self.assertEqual(list(manifest.entries), ["kept.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
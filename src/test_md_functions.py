@@ -3,7 +3,6 @@ from md_functions import (
     split_nodes_delimiter,
     extract_markdown_images,
     extract_markdown_links,
-    split_node,
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
@@ -12,8 +11,14 @@ from md_functions import (
     BlockType,
     text_to_children,
     markdown_to_html_node,
+    markdown_to_document,
+    read_document,
+    read_title,
+    iter_blocks,
     extract_list_items
 )
+from io import StringIO
+from render_cache import BlockCache
 from htmlnode import LeafNode, ParentNode
 from textnode import TextNode, TextType
 
@@ -197,22 +202,6 @@ class TestFunctions(unittest.TestCase):
             extract_markdown_links(text),
         )
 
-    def test_split_node_image(self):
-        node = TextNode(
-            "This is text with an image ![image](https://www.boot.dev/image.png)",
-            TextType.TEXT,
-        )
-        new_nodes = split_node(
-            node, "image", "https://www.boot.dev/image.png", TextType.IMAGE
-        )
-        self.assertEqual(
-            [
-                TextNode("This is text with an image ", TextType.TEXT),
-                TextNode("image", TextType.IMAGE, "https://www.boot.dev/image.png"),
-            ],
-            new_nodes,
-        )
-
     def test_split_images(self):
         node = TextNode(
             "This is text with an ![image](https://i.imgur.com/zjjcJKZ.png) and another ![second image](https://i.imgur.com/3elNhQu.png)",
@@ -362,6 +351,35 @@ class TestFunctions(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_links_repeated(self):
+        node = TextNode("[a](/x) and [a](/x)[b](/y)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("a", TextType.LINK, "/x"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "/x"),
+                TextNode("b", TextType.LINK, "/y"),
+            ],
+            split_nodes_link([node]),
+        )
+
+    def test_split_links_ignores_images(self):
+        node = TextNode("![image](/a.png) and [link](/b)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("![image](/a.png) and ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "/b"),
+            ],
+            split_nodes_link([node]),
+        )
+
+    def test_split_links_many(self):
+        text = " ".join(f"[link {i}](/page/{i})" for i in range(1000))
+        new_nodes = split_nodes_link([TextNode(text, TextType.TEXT)])
+        self.assertEqual(len(new_nodes), 1999)
+        self.assertEqual(new_nodes[-1], TextNode("link 999", TextType.LINK, "/page/999"))
+        self.assertEqual(new_nodes[1], TextNode(" ", TextType.TEXT))
+
     def test_text_to_textnodes(self):
         text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
         nodes = text_to_textnodes(text)
@@ -383,6 +401,66 @@ class TestFunctions(unittest.TestCase):
             nodes,
         )
 
+    def test_text_to_textnodes_matches_split_cascade(self):
+        texts = [
+            "plain text",
+            "",
+            "**bold** and _italic_ and `code`",
+            "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)",
+            "**bold with _underscores_ inside**",
+            "****empty bold",
+            "![image](/images/tom.png)[link](/blog/tom)![second](/b.png)",
+            "[same](/a) and [same](/a) again",
+        ]
+
+        def cascade(text):
+            node = TextNode(text, TextType.TEXT)
+            nodes = split_nodes_delimiter([node], "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            return split_nodes_link(split_nodes_image(nodes))
+
+        for text in texts:
+            self.assertListEqual(cascade(text), text_to_textnodes(text), text)
+
+        # Delimiters inside link text used to break the link apart; the
+        # tokenizer keeps the link and leaves its text as written
+        text = "[**b**](u)"
+        self.assertListEqual(
+            cascade(text),
+            [
+                TextNode("[", TextType.TEXT),
+                TextNode("b", TextType.BOLD),
+                TextNode("](u)", TextType.TEXT),
+            ],
+        )
+        self.assertListEqual(
+            text_to_textnodes(text), [TextNode("**b**", TextType.LINK, "u")]
+        )
+
+    def test_text_to_textnodes_invalid(self):
+        for text in ["an **unclosed bold", "an _unclosed italic", "a `code"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+    def test_text_to_textnodes_delimiters_in_code(self):
+        self.assertListEqual(
+            [
+                TextNode("code with **stars**", TextType.CODE),
+                TextNode(" after", TextType.TEXT),
+            ],
+            text_to_textnodes("`code with **stars**` after"),
+        )
+
+    def test_text_to_textnodes_underscore_in_url(self):
+        self.assertListEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("the docs", TextType.LINK, "https://a.dev/some_path_here"),
+            ],
+            text_to_textnodes("see [the docs](https://a.dev/some_path_here)"),
+        )
+
     def test_markdown_to_blocks(self):
         md = """
     This is **bolded** paragraph
@@ -489,6 +567,20 @@ class TestFunctions(unittest.TestCase):
             block_to_block_type("1. This is not a List\n2.List"), BlockType.PARAGRAPH
         )
 
+    def test_block_to_block_type_single_match_edge_cases(self):
+        self.assertEqual(block_to_block_type("```"), BlockType.CODE)
+        self.assertEqual(block_to_block_type("#\tTabbed heading"), BlockType.HEADING)
+        self.assertEqual(block_to_block_type("# "), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("> quote\n\n> quote"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("- item\n- "), BlockType.UNORDERT_LIST)
+        self.assertEqual(
+            block_to_block_type("1. one\n2. two\n4. four"), BlockType.PARAGRAPH
+        )
+        self.assertEqual(
+            block_to_block_type("\n".join(f"{i}. item" for i in range(1, 12))),
+            BlockType.ORDERED_LIST,
+        )
+
     def test_text_to_children_simple(self):
         text = "This is text with **bolded** text"
         children = text_to_children(text)
@@ -651,4 +743,111 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(
             html,
             "<div><ol><li>This is a list</li><li>with items</li></ol></div>",
-        )
\ No newline at end of file
+        )
+    def test_markdown_to_document(self):
+        md = """
+    ## Intro
+
+    # Tolkien Fan Club
+
+    ![JRR Tolkien sitting](/images/tolkien.png)
+
+    - [Glorfindel](/blog/glorfindel)
+    - [Tom](/blog/tom)
+
+    ```
+    code words here
+    ```
+    """
+        document = markdown_to_document(md)
+        self.assertEqual(document.title, "Tolkien Fan Club")
+        self.assertEqual(document.headings, [(2, "Intro"), (1, "Tolkien Fan Club")])
+        self.assertEqual(
+            document.links, [("Glorfindel", "/blog/glorfindel"), ("Tom", "/blog/tom")]
+        )
+        self.assertEqual(document.images, [("JRR Tolkien sitting", "/images/tolkien.png")])
+        self.assertEqual(document.word_count, 9)
+        self.assertEqual(document.node.to_html(), markdown_to_html_node(md).to_html())
+
+    def test_markdown_to_document_without_title(self):
+        self.assertIsNone(markdown_to_document("## Only a subheading").title)
+
+    def test_iter_blocks_matches_markdown_to_blocks(self):
+        texts = [
+            "",
+            "\n\n\n",
+            "# Title\n\nparagraph\nsame paragraph\n\n- a\n- b\n",
+            "a\n  \nb",
+            "a\n\n\nb",
+            "a\n \n\nb\n\n\n\n  c  \n",
+            "  indented\n\t tabbed \n\n\n\n",
+        ]
+        for text in texts:
+            self.assertEqual(
+                list(iter_blocks(StringIO(text))), markdown_to_blocks(text), repr(text)
+            )
+            self.assertEqual(
+                list(iter_blocks(text.split("\n"))), markdown_to_blocks(text), repr(text)
+            )
+
+    def test_iter_blocks_is_lazy(self):
+        def lines():
+            yield "first block\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+
+        self.assertEqual(next(iter_blocks(lines())), "first block")
+
+    def test_read_title(self):
+        md = "Intro\n\n## Sub\n\n#  Title \n\n# Second\n"
+        self.assertEqual(read_title(StringIO(md)), markdown_to_document(md).title)
+        self.assertEqual(read_title(StringIO(md)), "Title")
+        self.assertIsNone(read_title(StringIO("## no title\n")))
+
+        def lines():
+            yield "# Title\n"
+            yield "\n"
+            raise AssertionError("read past the title")
+
+        self.assertEqual(read_title(lines()), "Title")
+
+    def test_read_document(self):
+        md = "# Title\n\nSome **bold** text\n\n- a\n- [b](/b)\n"
+        document = read_document(StringIO(md))
+        self.assertEqual(document.title, "Title")
+        self.assertEqual(document.links, [("b", "/b")])
+        self.assertEqual(
+            document.node.to_html(), markdown_to_document(md).node.to_html()
+        )
+
+    def test_markdown_to_document_block_cache(self):
+        md = """# Title
+
+Some **bold** [link](/a) text
+
+![image](/b.png)
+
+## Sub
+
+```
+some code
+```"""
+        block_cache = BlockCache()
+        cold = markdown_to_document(md, block_cache)
+        warm = markdown_to_document(md, block_cache)
+        uncached = markdown_to_document(md)
+        self.assertEqual(block_cache.misses, 5)
+        self.assertEqual(block_cache.hits, 5)
+        for document in (cold, warm):
+            self.assertEqual(document.node.to_html(), uncached.node.to_html())
+            self.assertEqual(document.metadata(), uncached.metadata())
+
+    def test_block_cache_shared_across_pages(self):
+        block_cache = BlockCache()
+        markdown_to_document("# One\n\nShared footer", block_cache)
+        document = markdown_to_document("# Two\n\nShared footer", block_cache)
+        self.assertEqual(block_cache.hits, 1)
+        self.assertEqual(document.title, "Two")
+        self.assertEqual(
+            document.node.to_html(), "<div><h1>Two</h1><p>Shared footer</p></div>"
+        )
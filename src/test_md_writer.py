@@ -0,0 +1,119 @@
+import os
+import random
+import unittest
+from document import Document
+from md_functions import markdown_to_document, markdown_to_html_node
+from md_writer import markdown_to_html
+from render_cache import BlockCache
+
+CONTENT_DIR = os.path.join(os.path.dirname(__file__), "..", "content")
+
+CASES = [
+    "",
+    "# Title",
+    "#  Spaced title ",
+    "# Multi\nline heading",
+    "###### Deep",
+    "Plain paragraph\nover two lines",
+    "Some **bold**, _italic_ and `code` text",
+    "Empty ****, __ and `` markers",
+    "`code with **stars**`",
+    "A [link](/a) and ![image](/b.png) and [another](https://example.com)",
+    "![first](/1.png)![second](/2.png)",
+    "```\ncode block\n  indented\n```",
+    "```\n```",
+    "> quoted\n> with **bold**",
+    "- item\n- [linked](/x)\n- `code`",
+    "1. first\n2. second\n3. _third_",
+    "1. first\n3. not a list",
+    "Broken **bold",
+    "Broken _italic",
+    "- item\n- broken `code",
+]
+
+FRAGMENTS = [
+    "word",
+    "two words",
+    " ",
+    "**bold**",
+    "_italic_",
+    "`code`",
+    "[link](/path)",
+    "![alt](/img.png)",
+    "[](/empty)",
+    "[",
+    "](",
+    "!",
+]
+# Unmatched delimiters make the whole page invalid, so they stay rare
+STRAY_DELIMITERS = ["**", "_", "`"]
+
+LINE_STARTS = ["", "# ", "## ", "> ", "- ", "1. ", "2. ", "#"]
+
+
+def random_markdown(rng):
+    blocks = []
+    for _ in range(rng.randint(1, 6)):
+        lines = []
+        for _ in range(rng.randint(1, 4)):
+            text = "".join(
+                rng.choice(STRAY_DELIMITERS if rng.random() < 0.02 else FRAGMENTS)
+                for _ in range(rng.randint(0, 6))
+            )
+            lines.append(rng.choice(LINE_STARTS) + text)
+        if rng.random() < 0.1:
+            lines = ["```", *lines, "```"]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def render_with_nodes(markdown):
+    try:
+        document = markdown_to_document(markdown)
+    except ValueError:
+        return ValueError
+    return markdown_to_html_node(markdown).to_html(), document.metadata()
+
+
+def render_direct(markdown, block_cache=None):
+    document = Document()
+    try:
+        html = markdown_to_html(markdown, document, block_cache)
+    except ValueError:
+        return ValueError
+    return html, document.metadata()
+
+
+class TestMarkdownWriter(unittest.TestCase):
+    def assert_identical(self, markdown, block_cache=None):
+        self.assertEqual(
+            render_direct(markdown, block_cache), render_with_nodes(markdown), repr(markdown)
+        )
+
+    def test_cases(self):
+        for markdown in CASES:
+            self.assert_identical(markdown)
+
+    def test_content(self):
+        for dirpath, _, filenames in os.walk(CONTENT_DIR):
+            for filename in filenames:
+                with open(os.path.join(dirpath, filename)) as file:
+                    self.assert_identical(file.read())
+
+    def test_random_markdown(self):
+        rng = random.Random(0)
+        block_cache = BlockCache()
+        for _ in range(2000):
+            markdown = random_markdown(rng)
+            self.assert_identical(markdown)
+            self.assert_identical(markdown, block_cache)
+        self.assertGreater(block_cache.hits, 0)
+
+    def test_without_document(self):
+        self.assertEqual(
+            markdown_to_html("# Title\n\nText"), "<div><h1>Title</h1><p>Text</p></div>"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pipeline import (
+    OutputReport,
+    PagePipeline,
+    has_content,
+    replace_file,
+    stream_file,
+)
+from site_fixture import TempDirTestCase
+
+
+def render_upper(from_path, dest_path, markdown):
+    if "fail" in markdown:
+        raise ValueError("cannot render")
+    return markdown.upper(), {"source": from_path}, {"parse": 0.0}, "cached" in markdown
+
+
+def stream_upper(from_path, dest_path):
+    with open(from_path) as source:
+        markdown = source.read()
+    if "fail" in markdown:
+        raise ValueError("cannot stream")
+    written = stream_file(dest_path, lambda file: file.write(markdown.upper()))
+    return written, {"streamed": from_path}, None
+
+
+class TestPagePipeline(TempDirTestCase):
+    def pages(self, count):
+        pages = []
+        for i in range(count):
+            self.write(f"{i}.md", f"page {i}")
+            pages.append((self.path(f"{i}.md"), self.path(f"{i}.html")))
+        return pages
+
+    def test_run(self):
+        pages = self.pages(5)
+        rendered, failed = PagePipeline(render_upper, prefetch=2).run(pages)
+        self.assertEqual(failed, {})
+        self.assertEqual(list(rendered), [from_path for from_path, _ in pages])
+        for i in range(5):
+            self.assertEqual(self.read(f"{i}.html"), f"PAGE {i}")
+
+    def test_run_with_executor(self):
+        pages = self.pages(10)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            pipeline = PagePipeline(render_upper, executor, io_workers=2, prefetch=3)
+            rendered, failed = pipeline.run(pages)
+        self.assertEqual(failed, {})
+        self.assertEqual(len(rendered), 10)
+        self.assertEqual(self.read("9.html"), "PAGE 9")
+
+    def test_small_pages_are_chunked(self):
+        pages = self.pages(10)
+        self.write("3.md", "fail")
+        costs = {from_path: 0.001 for from_path, _ in pages}
+        del costs[pages[0][0]]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            submitted = []
+            submit = executor.submit
+            executor.submit = lambda *args: submitted.append(args) or submit(*args)
+            pipeline = PagePipeline(render_upper, executor, costs=costs)
+            rendered, failed = pipeline.run(pages)
+        # The unknown page goes alone, the rest share one task
+        self.assertEqual([len(args[2]) for args in submitted], [1, 9])
+        self.assertEqual(list(failed), [self.path("3.md")])
+        self.assertEqual(len(rendered), 9)
+        self.assertEqual(sorted(pipeline.durations), sorted(rendered))
+        self.assertGreater(pipeline.elapsed, 0)
+        self.assertEqual(self.read("9.html"), "PAGE 9")
+
+    def test_cached_pages_keep_their_duration(self):
+        pages = self.pages(2)
+        self.write("1.md", "cached page")
+        pipeline = PagePipeline(render_upper)
+        pipeline.run(pages)
+        self.assertEqual(list(pipeline.durations), [self.path("0.md")])
+
+    def test_large_pages_are_streamed(self):
+        pages = self.pages(3)
+        self.write("1.md", "a much longer page")
+        self.write("2.md", "a longer page that fails")
+        report = OutputReport()
+        pipeline = PagePipeline(
+            render_upper, report=report, stream=stream_upper, stream_bytes=10
+        )
+        rendered, failed = pipeline.run(pages)
+        self.assertEqual(rendered[self.path("0.md")], {"source": self.path("0.md")})
+        self.assertEqual(rendered[self.path("1.md")], {"streamed": self.path("1.md")})
+        self.assertEqual(list(failed), [self.path("2.md")])
+        self.assertEqual(self.read("1.html"), "A MUCH LONGER PAGE")
+        self.assertIn(self.path("1.md"), pipeline.durations)
+
+        # Identical streamed output is left alone
+        os.utime(self.path("1.html"), ns=(0, 0))
+        report = OutputReport()
+        PagePipeline(
+            render_upper, report=report, stream=stream_upper, stream_bytes=10
+        ).run(pages[:2])
+        self.assertEqual(sorted(report.unchanged), [self.path("0.html"), self.path("1.html")])
+        self.assertEqual(os.stat(self.path("1.html")).st_mtime_ns, 0)
+        self.assertEqual(sorted(os.listdir(self.root)), [
+            "0.html", "0.md", "1.html", "1.md", "2.md",
+        ])
+
+    def test_large_pages_are_streamed_on_the_executor(self):
+        pages = self.pages(2)
+        self.write("1.md", "a much longer page")
+        submitted = []
+        merged = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            submit = executor.submit
+
+            def record(function, *args):
+                submitted.append(function.__name__)
+                return submit(function, *args)
+
+            executor.submit = record
+            pipeline = PagePipeline(
+                render_upper,
+                executor,
+                stream=stream_upper,
+                stream_bytes=10,
+                collect=lambda: ["block"],
+                merge=merged.append,
+            )
+            rendered, failed = pipeline.run(pages)
+        self.assertEqual(failed, {})
+        self.assertEqual(sorted(submitted), ["render_pages", "stream_page"])
+        self.assertEqual(merged, [["block"], ["block"]])
+        self.assertEqual(self.read("1.html"), "A MUCH LONGER PAGE")
+        self.assertGreater(pipeline.busy, 0.0)
+
+    def test_timings(self):
+        pages = self.pages(2)
+        pipeline = PagePipeline(render_upper)
+        pipeline.run(pages)
+        self.assertEqual(
+            sorted(pipeline.timings[pages[0][0]]), ["parse", "read", "write"]
+        )
+
+    def test_failures(self):
+        pages = self.pages(3)
+        self.write("1.md", "fail")
+        missing = (self.path("missing.md"), self.path("missing.html"))
+        self.write("3.md", "page 3")
+        unwritable = (self.path("3.md"), self.path(os.path.join("nodir", "3.html")))
+        rendered, failed = PagePipeline(render_upper).run(pages + [missing, unwritable])
+        self.assertIsInstance(failed[self.path("1.md")], ValueError)
+        self.assertIsInstance(failed[self.path("missing.md")], FileNotFoundError)
+        self.assertIsInstance(failed[self.path("3.md")], FileNotFoundError)
+        self.assertEqual(sorted(rendered), [self.path("0.md"), self.path("2.md")])
+        self.assertEqual(self.read("2.html"), "PAGE 2")
+        self.assertFalse(os.path.exists(self.path("1.html")))
+
+    def test_unchanged_output_is_not_rewritten(self):
+        pages = self.pages(2)
+        PagePipeline(render_upper).run(pages)
+        os.utime(self.path("0.html"), ns=(0, 0))
+        os.utime(self.path("1.html"), ns=(0, 0))
+        self.write("1.md", "page one")
+        report = OutputReport()
+        PagePipeline(render_upper, report=report).run(pages)
+        self.assertEqual(report.unchanged, [self.path("0.html")])
+        self.assertEqual(report.written, [self.path("1.html")])
+        self.assertEqual(os.stat(self.path("0.html")).st_mtime_ns, 0)
+        self.assertEqual(self.read("1.html"), "PAGE ONE")
+
+    def test_has_content(self):
+        self.write("a.html", "caf\u00e9")
+        self.assertTrue(has_content(self.path("a.html"), "caf\u00e9"))
+        self.assertFalse(has_content(self.path("a.html"), "cafe"))
+        self.assertFalse(has_content(self.path("a.html"), "caf\u00e8"))
+        self.assertFalse(has_content(self.path("missing.html"), ""))
+
+    def test_report_summary(self):
+        report = OutputReport()
+        report.add("a.html", True)
+        report.add("b.html", False)
+        report.deleted.append("c.html")
+        self.assertEqual(report.outputs(), {"a.html", "b.html"})
+        self.assertEqual(report.summary(), "Outputs: 1 written, 1 unchanged, 1 deleted")
+        report.add_workers(4, 3.0, 1.0)
+        self.assertEqual(
+            report.summary(),
+            "Outputs: 1 written, 1 unchanged, 1 deleted\n"
+            "Render workers: 4, 75% busy over 1.00s",
+        )
+
+    def test_replace_file_removes_partial_output(self):
+        def write(file):
+            file.write("partial")
+            raise ValueError("interrupted")
+
+        with self.assertRaises(ValueError):
+            replace_file(self.path("out.html"), write)
+        self.assertEqual(os.listdir(self.root), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
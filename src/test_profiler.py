@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+from md_functions import markdown_to_html_node
+from md_writer import markdown_to_html
+from profiler import BuildProfile, StageTimer
+from render_cache import BlockCache
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage_timer(self):
+        timer = StageTimer()
+        timer.lap("read")
+        timer.lap("write")
+        timer.lap("read")
+        self.assertEqual(list(timer.timings), ["read", "write"])
+        self.assertTrue(all(seconds >= 0 for seconds in timer.timings.values()))
+
+    def test_profile_markdown_to_html(self):
+        markdown = "# Title\n\nSome **bold** text\n\n- a\n- b"
+        timer = StageTimer()
+        html = markdown_to_html(markdown, timer=timer)
+        self.assertEqual(html, markdown_to_html_node(markdown).to_html())
+        self.assertEqual(
+            list(timer.timings), ["markdown_to_blocks", "block typing", "inline parsing"]
+        )
+        timer = StageTimer()
+        self.assertEqual(markdown_to_html(markdown, None, BlockCache(), timer), html)
+        self.assertEqual(
+            list(timer.timings),
+            ["markdown_to_blocks", "block cache", "block typing", "inline parsing"],
+        )
+
+    def make_profile(self):
+        profile = BuildProfile()
+        profile.add("a.md", {"read": 0.001, "write": 0.002})
+        profile.add("b.md", {"read": 0.004, "inline parsing": 0.010})
+        profile.add("c.md", {"read": 0.001})
+        profile.finish()
+        return profile
+
+    def test_totals(self):
+        totals = self.make_profile().totals()
+        self.assertEqual(list(totals), ["read", "inline parsing", "write"])
+        self.assertAlmostEqual(totals["read"], 0.006)
+
+    def test_slowest(self):
+        slowest = self.make_profile().slowest(2)
+        self.assertEqual([page for page, _ in slowest], ["b.md", "a.md"])
+
+    def test_report(self):
+        report = self.make_profile().report(1)
+        self.assertIn("inline parsing", report)
+        self.assertIn("slowest 1 of 3 pages:", report)
+        self.assertIn("b.md  (mostly inline parsing: 10.00 ms)", report)
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "nested", "profile.json")
+            self.make_profile().save(path, 1)
+            with open(path) as file:
+                data = json.load(file)
+        self.assertEqual(data["page_count"], 3)
+        self.assertEqual(data["slowest"][0]["page"], "b.md")
+        self.assertEqual(sorted(data["pages"]), ["a.md", "b.md", "c.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch
+from render_cache import BlockCache, RenderCache
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(os.path.join(self.tmp.name, "cache"), max_bytes=100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key(self):
+        self.assertEqual(self.cache.key("# Hello"), self.cache.key("# Hello"))
+        self.assertNotEqual(self.cache.key("# Hello"), self.cache.key("# World"))
+
+    def test_key_includes_parser_version(self):
+        key = self.cache.key("# Hello")
+        with patch("render_cache.PARSER_VERSION", -1):
+            self.assertNotEqual(self.cache.key("# Hello"), key)
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get(self.cache.key("# Hello")))
+
+    def test_put_and_get(self):
+        key = self.cache.key("# Hello")
+        self.cache.put(key, "<div><h1>Hello</h1></div>", {"title": "Hello"})
+        self.assertEqual(
+            self.cache.get(key), ("<div><h1>Hello</h1></div>", {"title": "Hello"})
+        )
+
+    def test_evict_least_recently_used(self):
+        keys = [self.cache.key(str(i)) for i in range(3)]
+        for age, key in enumerate(keys):
+            self.cache.put(key, "x" * 20, {})
+            os.utime(self.cache.path(key), ns=(age, age))
+        self.cache.get(keys[0])
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(self.cache.get(keys[0]), ("x" * 20, {}))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertEqual(self.cache.get(keys[2]), ("x" * 20, {}))
+
+    def test_evict_empty(self):
+        self.assertEqual(self.cache.evict(), 0)
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = BlockCache(max_bytes=20)
+        cache.put("a", "<p>a</p>", {})
+        cache.put("b", "<p>b</p>", {})
+        cache.get("a")
+        cache.put("c", "<p>c</p>", {})
+        self.assertEqual(list(cache.blocks), ["a", "c"])
+        self.assertEqual(cache.size, 18)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_size_counts_encoded_bytes(self):
+        cache = BlockCache(max_bytes=20)
+        cache.put("\u00e9\u00e9", "<p>\u00e9\u00e9</p>", {})
+        self.assertEqual(cache.size, 15)
+        cache.put("b", "<p>b</p>", {})
+        self.assertEqual(list(cache.blocks), ["b"])
+
+    def test_track_and_merge(self):
+        parent = BlockCache()
+        parent.put("a", "<p>a</p>", {})
+        worker = pickle.loads(pickle.dumps(parent))
+        worker.track()
+        worker.put("b", "<p>b</p>", {"word_count": 1})
+        worker.get("a")
+        parent.merge(worker.take_added())
+        self.assertEqual(worker.take_added(), {})
+        self.assertEqual(list(parent.blocks), ["a", "b"])
+        self.assertEqual(parent.get("b"), ("<p>b</p>", {"word_count": 1}))
+        self.assertIsNone(parent.added)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "blocks.json")
+            cache = BlockCache()
+            cache.put("a", "<p>a</p>", {"word_count": 1})
+            cache.put("b", "<p>b</p>", {"word_count": 1})
+            cache.get("a")
+            cache.save(path)
+            loaded = BlockCache.load(path)
+            self.assertEqual(list(loaded.blocks), ["b", "a"])
+            self.assertEqual(loaded.get("a"), ("<p>a</p>", {"word_count": 1}))
+            with patch("render_cache.PARSER_VERSION", -1):
+                self.assertEqual(len(BlockCache.load(path)), 0)
+            self.assertEqual(len(BlockCache.load(os.path.join(tmp, "missing.json"))), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+from schedule import RenderDurations
+
+
+class TestRenderDurations(unittest.TestCase):
+    def test_schedule_longest_first(self):
+        durations = RenderDurations("durations.json", {"a.md": 0.1, "b.md": 2.0, "c.md": 0.5})
+        pages = [(name, name.replace(".md", ".html")) for name in ("a.md", "b.md", "new.md", "c.md")]
+        self.assertEqual(
+            [from_path for from_path, _ in durations.schedule(pages)],
+            ["new.md", "b.md", "c.md", "a.md"],
+        )
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, "page.md")
+            with open(page, "w") as file:
+                file.write("# Page")
+            path = os.path.join(tmp, ".build", "durations.json")
+            durations = RenderDurations.load(path)
+            self.assertEqual(durations.pages, {})
+            durations.record({page: 0.25, os.path.join(tmp, "deleted.md"): 1.0})
+            durations.save()
+            self.assertEqual(RenderDurations.load(path).pages, {page: 0.25})
+            with open(path, "w") as file:
+                file.write("{not json")
+            self.assertEqual(RenderDurations.load(path).pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import io
+import os
+import threading
+import unittest
+from contextlib import redirect_stdout
+from functools import partial
+from http.server import ThreadingHTTPServer
+from urllib.request import urlopen
+from server import LIVERELOAD_SCRIPT, LiveReloadHandler, LiveSite, inject_livereload
+from site_fixture import SiteTestCase
+
+
+class TestLiveSite(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.site = LiveSite(self.static, self.content, self.template, self.docs)
+        self.site.build()
+
+    def write(self, path, text):
+        path = super().write(path, text)
+        # Make every write visible to the mtime based poller
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        return path
+
+    def test_build(self):
+        self.assertEqual(
+            self.read(self.path("docs", "index.html")),
+            '<title>Home</title><main><div><h1>Home</h1><p><a href="/blog/tom">Tom</a>'
+            "</p></div></main>",
+        )
+        self.assertEqual(self.read(self.path("docs", "index.css")), "body {}")
+
+    def test_poll_without_changes(self):
+        self.assertEqual(self.site.poll(), set())
+        self.assertEqual(self.site.version, 0)
+
+    def test_poll_rerenders_changed_page_only(self):
+        tom = self.path("docs", "blog", "tom", "index.html")
+        self.write(tom, "untouched")
+        self.write(self.path("content", "index.md"), "# Changed")
+        self.assertEqual(self.site.poll(), {self.path("content", "index.md")})
+        self.assertIn("<h1>Changed</h1>", self.read(self.path("docs", "index.html")))
+        self.assertEqual(self.read(tom), "untouched")
+        self.assertEqual(self.site.version, 1)
+
+    def test_poll_template_change_rewraps_all_pages(self):
+        self.write(self.template, "<h2>{{ Title }}</h2>")
+        self.site.poll()
+        self.assertEqual(self.read(self.path("docs", "index.html")), "<h2>Home</h2>")
+        self.assertEqual(
+            self.read(self.path("docs", "blog", "tom", "index.html")), "<h2>Tom</h2>"
+        )
+
+    def test_poll_added_and_removed_files(self):
+        os.remove(self.path("content", "blog", "tom", "index.md"))
+        os.remove(self.path("static", "index.css"))
+        self.write(self.path("content", "contact.md"), "# Contact")
+        self.site.poll()
+        self.assertFalse(os.path.exists(self.path("docs", "blog", "tom", "index.html")))
+        self.assertFalse(os.path.exists(self.path("docs", "index.css")))
+        self.assertTrue(os.path.exists(self.path("docs", "contact.html")))
+
+    def test_poll_error_keeps_previous_output(self):
+        index = self.path("content", "index.md")
+        self.write(index, "no title")
+        self.write(self.path("content", "blog", "tom", "index.md"), "# Tom again")
+        self.write(self.template, "<h2>{{ Title }}</h2>")
+        self.write(self.path("static", "index.css"), "body { margin: 0 }")
+        with redirect_stdout(io.StringIO()) as output:
+            changed = self.site.poll()
+        # The broken page doesn't stop the rest of the batch
+        self.assertNotIn(index, changed)
+        self.assertEqual(len(changed), 3)
+        self.assertIn("Rebuild failed for", output.getvalue())
+        self.assertIn("<h1>Home</h1>", self.read(self.path("docs", "index.html")))
+        self.assertEqual(
+            self.read(self.path("docs", "blog", "tom", "index.html")),
+            "<h2>Tom again</h2>",
+        )
+        self.assertEqual(self.read(self.path("docs", "index.css")), "body { margin: 0 }")
+
+        # The failed page is retried until it renders, and reported only once
+        with redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(self.site.poll(), set())
+        self.assertEqual(output.getvalue(), "")
+        self.write(index, "# Fixed")
+        self.assertEqual(self.site.poll(), {index})
+        self.assertEqual(self.read(self.path("docs", "index.html")), "<h2>Fixed</h2>")
+
+    def test_inject_livereload(self):
+        self.assertEqual(
+            inject_livereload("<body>x</body></html>"),
+            f"<body>x{LIVERELOAD_SCRIPT}</body></html>",
+        )
+        self.assertEqual(inject_livereload("x"), f"x{LIVERELOAD_SCRIPT}")
+
+    def test_handler_injects_livereload(self):
+        handler = partial(LiveReloadHandler, directory=self.path("docs"), site=self.site)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            with urlopen(f"{url}/") as response:
+                self.assertIn(LIVERELOAD_SCRIPT, response.read().decode())
+            with urlopen(f"{url}/index.css") as response:
+                self.assertEqual(response.read(), b"body {}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import argparse
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from main import build_full
+from manifest import file_hash
+from shard import (
+    SHARD_MANIFEST,
+    assign_shards,
+    load_costs,
+    merge_shards,
+    parse_shard,
+    select_shard,
+)
+from site_fixture import SiteTestCase
+
+
+class TestShardFunctions(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_assign_shards_is_stable(self):
+        names = [f"blog/post-{i}/index.md" for i in range(50)]
+        shards = assign_shards(names, 4)
+        self.assertEqual(shards, assign_shards(list(reversed(names)), 4))
+        self.assertEqual(set(shards.values()), {0, 1, 2, 3})
+        # Adding a page leaves every other page where it was
+        more = assign_shards(names + ["new.md"], 4)
+        self.assertEqual({name: more[name] for name in names}, shards)
+
+    def test_assign_shards_balances_costs(self):
+        costs = {"big.md": 10.0, "a.md": 4.0, "b.md": 3.0, "c.md": 3.0}
+        shards = assign_shards(list(costs) + ["new.md"], 2, costs)
+        loads = [0.0, 0.0]
+        for name, shard in shards.items():
+            loads[shard] += costs.get(name, 4.0)
+        self.assertEqual(sorted(loads), [11.0, 13.0])
+        self.assertEqual(shards["big.md"], 0)
+
+    def test_select_shard_covers_every_page_once(self):
+        pages = [(os.path.join("content", f"{i}.md"), f"docs/{i}.html") for i in range(20)]
+        selected = [select_shard(pages, "content", (k, 3)) for k in (1, 2, 3)]
+        self.assertEqual(sorted(sum(selected, [])), sorted(pages))
+
+    def test_load_costs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            with open(path, "w") as file:
+                json.dump({"pages": {"content/a.md": {"read": 0.5, "parse": 1.0}}}, file)
+            self.assertEqual(load_costs(path, "content"), {"a.md": 1.5})
+            with open(path, "w") as file:
+                json.dump({"content/b/index.md": 2}, file)
+            self.assertEqual(load_costs(path, "content"), {"b/index.md": 2.0})
+
+
+class TestShardBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(6):
+            self.write(self.path("content", f"page{i}.md"), f"# Page {i}")
+
+    def build(self, dest, shard=None):
+        with redirect_stdout(io.StringIO()):
+            build_full(
+                self.static,
+                self.content,
+                self.template,
+                dest,
+                "/",
+                shard=shard,
+            )
+
+    def build_shards(self, count):
+        shard_dirs = [self.path(f"shard{k}") for k in range(1, count + 1)]
+        for k, shard_dir in enumerate(shard_dirs, 1):
+            self.build(shard_dir, (k, count))
+        return shard_dirs
+
+    def tree(self, directory):
+        files = {}
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path) as file:
+                    files[os.path.relpath(path, directory)] = file.read()
+        return files
+
+    def test_merge_matches_full_build(self):
+        self.build(self.path("full"))
+        shard_dirs = self.build_shards(3)
+        self.assertTrue(os.path.exists(os.path.join(shard_dirs[0], "index.css")))
+        self.assertFalse(os.path.exists(os.path.join(shard_dirs[1], "index.css")))
+        report = merge_shards(shard_dirs, self.path("docs"), self.path("merge.json"))
+        self.assertEqual(len(report.written), 9)
+        self.assertEqual(self.tree(self.path("docs")), self.tree(self.path("full")))
+        with open(self.path("merge.json")) as file:
+            self.assertEqual(len(json.load(file)["outputs"]), 9)
+
+        # Merging again leaves the tree alone and prunes stray files
+        self.write(self.path("docs", "stale.html"), "old")
+        report = merge_shards(shard_dirs, self.path("docs"), self.path("merge.json"))
+        self.assertEqual(len(report.unchanged), 9)
+        self.assertEqual(report.deleted, [self.path("docs", "stale.html")])
+
+    def test_merge_rejects_collisions(self):
+        shard_dirs = self.build_shards(2)
+        manifest_path = os.path.join(shard_dirs[1], SHARD_MANIFEST)
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+        self.write(os.path.join(shard_dirs[1], "index.css"), "body {}")
+        manifest["outputs"]["index.css"] = file_hash(os.path.join(shard_dirs[1], "index.css"))
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file)
+        with self.assertRaises(Exception) as error:
+            merge_shards(shard_dirs, self.path("docs"), self.path("merge.json"))
+        self.assertIn("index.css is produced by both", str(error.exception))
+        self.assertFalse(os.path.exists(self.path("docs")))
+
+    def test_merge_rejects_missing_shards(self):
+        shard_dirs = self.build_shards(3)
+        with self.assertRaises(Exception) as error:
+            merge_shards(shard_dirs[:2], self.path("docs"), self.path("merge.json"))
+        self.assertIn("missing shards: [3]", str(error.exception))
+
+    def test_merge_rejects_out_of_range_shards(self):
+        shard_dirs = self.build_shards(3)
+        stray = self.path("stray")
+        self.build(stray, (3, 3))
+        manifest_path = os.path.join(stray, SHARD_MANIFEST)
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+        manifest["shard"] = 5
+        manifest["outputs"] = {}
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file)
+        with self.assertRaises(Exception) as error:
+            merge_shards(shard_dirs + [stray], self.path("docs"), self.path("merge.json"))
+        self.assertIn(f"{stray} has shard 5 of 3", str(error.exception))
+
+    def test_merge_rejects_modified_outputs(self):
+        shard_dirs = self.build_shards(2)
+        self.write(os.path.join(shard_dirs[0], "index.css"), "changed")
+        with self.assertRaises(Exception) as error:
+            merge_shards(shard_dirs, self.path("docs"), self.path("merge.json"))
+        self.assertIn("does not match its manifest", str(error.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import json
+import os
+import tempfile
+import unittest
+from state import load_state, save_state
+
+
+class TestState(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "nested", "state.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_load(self):
+        save_state(self.path, 2, {"pages": {"b.md": 1, "a.md": 2}})
+        self.assertEqual(load_state(self.path, 2), {"version": 2, "pages": {"a.md": 2, "b.md": 1}})
+        with open(self.path) as file:
+            self.assertEqual(list(json.load(file)), ["pages", "version"])
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["state.json"])
+
+    def test_load_missing_corrupt_or_other_version(self):
+        self.assertEqual(load_state(self.path, 1), {})
+        save_state(self.path, 1, {"pages": {}})
+        self.assertEqual(load_state(self.path, 2), {})
+        with open(self.path, "w") as file:
+            file.write("{not json")
+        self.assertEqual(load_state(self.path, 1), {})
+        with open(self.path, "w") as file:
+            file.write("[1]")
+        self.assertEqual(load_state(self.path, 1), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
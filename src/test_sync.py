@@ -0,0 +1,111 @@
+import os
+import unittest
+from manifest import Manifest
+from pipeline import OutputReport
+from site_fixture import TempDirTestCase
+from sync import copy_file, prune_directory, sync_directory
+
+
+class TestSync(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = self.path("static")
+        self.docs = self.path("docs")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "tom.png"), "png")
+
+    def test_sync_copies_new_files(self):
+        copied = sync_directory(self.static, self.docs)
+        self.assertEqual(
+            copied,
+            [
+                os.path.join(self.docs, "images", "tom.png"),
+                os.path.join(self.docs, "index.css"),
+            ],
+        )
+        self.assertEqual(self.read(os.path.join(self.docs, "index.css")), "body {}")
+
+    def test_sync_skips_unchanged_files(self):
+        sync_directory(self.static, self.docs)
+        self.assertEqual(sync_directory(self.static, self.docs), [])
+
+    def test_sync_copies_changed_files(self):
+        sync_directory(self.static, self.docs)
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body { color: red; }")
+        self.assertEqual(
+            sync_directory(self.static, self.docs), [os.path.join(self.docs, "index.css")]
+        )
+        self.assertEqual(
+            self.read(os.path.join(self.docs, "index.css")), "body { color: red; }"
+        )
+
+    def test_sync_checksum_skips_touched_files(self):
+        sync_directory(self.static, self.docs)
+        css = os.path.join(self.static, "index.css")
+        os.utime(css, ns=(1, 1))
+        self.assertEqual(sync_directory(self.static, self.docs, checksum=True), [])
+        self.assertEqual(os.stat(os.path.join(self.docs, "index.css")).st_mtime_ns, 1)
+
+    def test_sync_keeps_generated_files(self):
+        page = os.path.join(self.docs, "index.html")
+        self.write(page, "<html></html>")
+        sync_directory(self.static, self.docs)
+        self.assertEqual(self.read(page), "<html></html>")
+
+    def test_sync_records_manifest(self):
+        manifest = Manifest(os.path.join(self.root, "manifest.json"))
+        sync_directory(self.static, self.docs, manifest)
+        css = os.path.join(self.static, "index.css")
+        self.assertEqual(manifest.entries[css]["dest"], os.path.join(self.docs, "index.css"))
+        self.assertEqual(manifest.entries[css]["size"], len("body {}"))
+
+    def test_sync_hardlink(self):
+        sync_directory(self.static, self.docs, mode="hardlink")
+        source = os.stat(os.path.join(self.static, "index.css"))
+        destination = os.stat(os.path.join(self.docs, "index.css"))
+        self.assertEqual(source.st_ino, destination.st_ino)
+
+    def test_copy_file_hardlink_replaced_by_copy(self):
+        sync_directory(self.static, self.docs, mode="hardlink")
+        source = os.path.join(self.static, "index.css")
+        destination = os.path.join(self.docs, "index.css")
+        copy_file(source, destination)
+        self.assertNotEqual(os.stat(source).st_ino, os.stat(destination).st_ino)
+
+    def test_copy_file_reflink(self):
+        source = os.path.join(self.static, "index.css")
+        destination = os.path.join(self.root, "index.css")
+        copy_file(source, destination, "reflink")
+        self.assertEqual(self.read(destination), "body {}")
+        self.assertEqual(os.stat(source).st_mtime_ns, os.stat(destination).st_mtime_ns)
+
+    def test_copy_file_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            copy_file(os.path.join(self.static, "index.css"), self.docs, "symlink")
+
+
+    def test_sync_report(self):
+        sync_directory(self.static, self.docs)
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        report = OutputReport()
+        sync_directory(self.static, self.docs, report=report)
+        self.assertEqual(report.written, [os.path.join(self.docs, "index.css")])
+        self.assertEqual(report.unchanged, [os.path.join(self.docs, "images", "tom.png")])
+
+    def test_prune_directory(self):
+        sync_directory(self.static, self.docs)
+        self.write(os.path.join(self.docs, "old", "page.html"), "old")
+        self.write(os.path.join(self.docs, "stray.html"), "stray")
+        keep = [os.path.join(self.docs, "index.css"), os.path.join(self.docs, "images", "tom.png")]
+        removed = prune_directory(self.docs, keep)
+        self.assertEqual(
+            sorted(removed),
+            [os.path.join(self.docs, "old", "page.html"), os.path.join(self.docs, "stray.html")],
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "old")))
+        self.assertEqual(self.read(os.path.join(self.docs, "images", "tom.png")), "png")
+
+
+if __name__ == "__main__":
+    unittest.main()
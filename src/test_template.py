@@ -0,0 +1,97 @@
+import unittest
+from io import StringIO
+from htmlnode import LeafNode, ParentNode
+from template import (
+    BasepathWriter,
+    Template,
+    rewrite_basepath,
+    split_template,
+)
+
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self):
+        self.template = '<title>{{ Title }}</title><link href="/index.css"><article>{{ Content }}</article>'
+        self.content = ParentNode(
+            "div",
+            [
+                LeafNode("a", "Tom", {"href": "/blog/tom"}),
+                LeafNode("img", "", {"src": "/images/tom.png", "alt": "Tom"}),
+            ],
+        )
+
+    def replace_page(self, basepath):
+        html = self.template.replace("{{ Title }}", "Home")
+        html = html.replace("{{ Content }}", self.content.to_html())
+        html = html.replace('href="/', f'href="{basepath}')
+        return html.replace('src="/', f'src="{basepath}')
+
+    def test_split_template(self):
+        self.assertEqual(
+            split_template("<title>{{ Title }}</title><main>{{ Content }}</main>"),
+            ["<title>", "{{ Title }}", "</title><main>", "{{ Content }}", "</main>"],
+        )
+
+    def test_split_template_adjacent_slots(self):
+        self.assertEqual(
+            split_template("{{ Title }}{{ Content }}"),
+            ["{{ Title }}", "{{ Content }}"],
+        )
+
+    def test_rewrite_basepath(self):
+        self.assertEqual(
+            rewrite_basepath('<a href="/blog"><img src="/a.png"></a>', "/site/"),
+            '<a href="/site/blog"><img src="/site/a.png"></a>',
+        )
+        self.assertEqual(
+            rewrite_basepath('<a href="https://boot.dev">', "/site/"),
+            '<a href="https://boot.dev">',
+        )
+
+    def test_basepath_writer_split_across_writes(self):
+        out = StringIO()
+        writer = BasepathWriter(out, "/site/")
+        for chunk in ['<a hr', 'ef="', '/blog">x</a><img s', 'rc="/a.png">', "h"]:
+            writer.write(chunk)
+        writer.flush()
+        self.assertEqual(
+            out.getvalue(), '<a href="/site/blog">x</a><img src="/site/a.png">h'
+        )
+
+    def test_template_segments(self):
+        template = Template(self.template, "/site/")
+        self.assertEqual(
+            template.segments,
+            [
+                "<title>",
+                "{{ Title }}",
+                '</title><link href="/site/index.css"><article>',
+                "{{ Content }}",
+                "</article>",
+            ],
+        )
+
+    def test_template_render(self):
+        for basepath in ["/", "/site/"]:
+            template = Template(self.template, basepath)
+            self.assertEqual(
+                template.render("Home", self.content.to_html()),
+                self.replace_page(basepath),
+            )
+
+    def test_template_write(self):
+        for basepath in ["/", "/site/"]:
+            out = StringIO()
+            Template(self.template, basepath).write(out, "Home", self.content.write_html)
+            self.assertEqual(out.getvalue(), self.replace_page(basepath))
+
+    def test_template_reused_across_pages(self):
+        template = Template(self.template, "/site/")
+        first = template.render("One", "<p>1</p>")
+        second = template.render("Two", '<a href="/two">2</a>')
+        self.assertIn("<title>One</title>", first)
+        self.assertIn('<a href="/site/two">2</a>', second)
+        self.assertEqual(template.render("One", "<p>1</p>"), first)
+
+if __name__ == "__main__":
+    unittest.main()